@@ -1,6 +1,15 @@
-from typing import TYPE_CHECKING, List, Tuple, Dict
-from copy import deepcopy
+import logging
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, NamedTuple, Tuple, Dict, Optional
+from array import array
+from bisect import bisect_left, insort
+from heapq import merge
 from enum import IntFlag, IntEnum
+from random import Random
 from .Locations import (TGL_LOCID_BASE, TGL_LOCID_BONUS, TGL_LOCID_BONUS_GENERIC, TGL_LOCID_CORRIDOR, 
                         TGL_LOCID_CORRIDOR_GENERIC, TGL_LOCID_GROUND, TGL_LOCID_GROUND_GENERIC, TGL_LOCID_SHOP,
                         TGL_LOCID_SHOP_GENERIC)
@@ -121,6 +130,85 @@ item_locations = [
 ]
     
 
+MAP_DATA_MAX_BYTES = 1916  # Room data space available in ROM, not counting the terminator
+MAP_MAX_ATTEMPTS = 10  # Whole maps to try before giving up on generation
+
+# Layout generators, matching the map_layout option
+MAP_LAYOUT_GROWTH = 0
+MAP_LAYOUT_SPANNING_TREE = 1
+
+# Random streams of map randomization, see map_stream
+MAP_STREAM_SHUFFLE = 0
+MAP_STREAM_STARTING_POINTS = 1
+MAP_STREAM_LAYOUT = 2  # One per area
+MAP_STREAM_AREA_DECORATIONS = 3
+MAP_STREAM_PLACEMENT = 4  # One per area
+MAP_STREAM_FINISHING = 5
+
+
+def map_stream(map_seed: int, stream: int, index: int = 0) -> Random:
+    # Independent random generator for one stream of a map, and one area or attempt within that stream
+    return Random((map_seed << 16) | (stream << 8) | index)
+
+
+class TGLMapError(Exception):
+    """Map randomization failed in a way that can be retried with different random rolls."""
+
+
+class TGLMapEntranceError(TGLMapError):
+    """No border room could connect an Area to Area 0."""
+
+
+class TGLMapPlacementError(TGLMapError):
+    """An Area ran out of suitable rooms for its corridors, shops, items or other special rooms."""
+    area: Optional[int]
+
+    def __init__(self, message: str, area: Optional[int] = None):
+        super().__init__(message)
+        self.area = area
+
+
+class TGLMapSizeError(TGLMapError):
+    """The map data does not fit in the space available for it in ROM."""
+
+
+class TGLMapConnectivityError(TGLMapError):
+    """Rooms that must be visited cannot be reached from the start, or exits lead nowhere."""
+
+
+class TGLMapLocation(NamedTuple):
+    location_id: int  # Original AP location code of the item in this room
+    xcoord: int
+    ycoord: int
+
+
+class TGLMapSnapshot(NamedTuple):
+    """Everything the rest of generation needs from a randomized map: its ROM data and its location table.
+    Worlds keep this instead of the TGLMap, so the map's working state can be dropped as soon as it is generated."""
+    map_data: bytes  # writehex output
+    location_codes: Tuple[int, ...]  # Generic location IDs, sorted
+    locations: Tuple[TGLMapLocation, ...]  # Original location and coordinates for each of location_codes
+
+    @classmethod
+    def from_locations(cls, map_data: bytes, locations: Dict[int, TGLMapLocation]) -> "TGLMapSnapshot":
+        location_codes = tuple(sorted(locations))
+        return cls(map_data, location_codes, tuple(locations[code] for code in location_codes))
+
+    def location(self, code: int) -> TGLMapLocation:
+        i = bisect_left(self.location_codes, code)
+        if (i == len(self.location_codes)) or (self.location_codes[i] != code):
+            raise KeyError(code)
+        return self.locations[i]
+
+    def items(self) -> Iterator[Tuple[int, TGLMapLocation]]:
+        return zip(self.location_codes, self.locations)
+
+
+# Shop content_ids to their location offset from TGL_LOCID_SHOP / TGL_LOCID_SHOP_GENERIC
+shop_location_offsets = {0x3A: 2, 0x3B: 5, 0x3C: 8, 0x3D: 11, 0x3E: 14, 
+                         0x3F: 102, 0x40: 107, 0x41: 112, 0x42: 117, 0x43: 122}
+
+
 class TGLRoomType(IntEnum):
     NORMAL = 0
     SAVE = 1
@@ -140,49 +228,261 @@ class TGLRoomExits(IntFlag):
     UP    = 0b1000
 
 
+class TGLRoomFlags(IntFlag):
+    """Boolean room properties, packed into a single byte per room in the map's flags column."""
+    NONE          = 0b0000
+    ACCESSIBLE    = 0b0001
+    STARTINGPOINT = 0b0010  # If this room is a connection to Area 0
+    AVOID_SPECIAL = 0b0100
+    CHIP_TILE     = 0b1000  # Are there chip boxes?
+
+
+# Plain int masks used by the TGLMap internals. Enum flag arithmetic is slow in the hot loops, 
+#  so the map columns hold raw ints and the TGLRoom view converts them back to the enum types.
+EXIT_DOWN  = int(TGLRoomExits.DOWN)
+EXIT_RIGHT = int(TGLRoomExits.RIGHT)
+EXIT_LEFT  = int(TGLRoomExits.LEFT)
+EXIT_UP    = int(TGLRoomExits.UP)
+ROOM_ACCESSIBLE    = int(TGLRoomFlags.ACCESSIBLE)
+ROOM_STARTINGPOINT = int(TGLRoomFlags.STARTINGPOINT)
+ROOM_AVOID_SPECIAL = int(TGLRoomFlags.AVOID_SPECIAL)
+ROOM_CHIP_TILE     = int(TGLRoomFlags.CHIP_TILE)
+
+# Membership bits for the per-area room index in TGLMap
+INDEX_ROOMS          = 0b001
+INDEX_STARTING_POINT = 0b010
+INDEX_SUITABLE       = 0b100
+INDEXED_FLAGS = ROOM_ACCESSIBLE | ROOM_STARTINGPOINT
+
+MAP_WIDTH = 24
+MAP_HEIGHT = 24
+MAP_SIZE = MAP_WIDTH * MAP_HEIGHT
+
+
+# Exit directions in bit order, so the direction for column N of the neighbor table is EXIT_DIRECTIONS[N]
+EXIT_DIRECTIONS = (EXIT_DOWN, EXIT_RIGHT, EXIT_LEFT, EXIT_UP)
+EXIT_COLUMN = {direction: column for column, direction in enumerate(EXIT_DIRECTIONS)}
+# Exits mask -> the same exits seen from the other side (DRLU reversed to ULRD), e.g. EXIT_UP -> EXIT_DOWN
+EXIT_OPPOSITES = bytes(sum(EXIT_DIRECTIONS[3 - column] for column in range(4) if exits & EXIT_DIRECTIONS[column]) 
+                       for exits in range(16))
+
+
+def build_neighbor_table() -> Tuple[Tuple[int, int, int, int], ...]:
+    # Neighbor index of every room in each exit direction (Down Right Left Up), -1 where it would leave the map
+    table: List[Tuple[int, int, int, int]] = []
+    for index in range(MAP_SIZE):
+        ykey, xkey = divmod(index, MAP_WIDTH)
+        table.append((index + MAP_WIDTH if ykey < MAP_HEIGHT - 1 else -1, 
+                      index + 1 if xkey < MAP_WIDTH - 1 else -1, 
+                      index - 1 if xkey > 0 else -1, 
+                      index - MAP_WIDTH if ykey > 0 else -1))
+    return tuple(table)
+
+neighbor_table = build_neighbor_table()
+
+# Bitboards for the whole map, bit N is the room at index N
+BOARD_FULL = (1 << MAP_SIZE) - 1
+BOARD_NOT_LEFT_EDGE = BOARD_FULL ^ sum(1 << (ykey * MAP_WIDTH) for ykey in range(MAP_HEIGHT))
+BOARD_NOT_RIGHT_EDGE = BOARD_FULL ^ sum(1 << (ykey * MAP_WIDTH + MAP_WIDTH - 1) for ykey in range(MAP_HEIGHT))
+MAP_START_ROOM = 12 * MAP_WIDTH + 11  # The starting text room, where the player enters Naju
+
+
+def board_table(matches: Callable[[int], bool]) -> bytes:
+    # Translation table from column values to binary digits, see to_board
+    return bytes(ord("1") if matches(value) else ord("0") for value in range(256))
+
+
+def to_board(column: bytearray, table: bytes) -> int:
+    # Bitboard of the rooms whose value in the column matches the table, parsed from a string of binary digits
+    #  (reversed, so the room at index 0 ends up in the lowest bit)
+    return int(column.translate(table)[::-1], 2)
+
+
+def board_indices(board: int) -> List[int]:
+    # Room indices of the set bits, lowest first
+    indices: List[int] = []
+    while board:
+        low_bit = board & -board
+        indices.append(low_bit.bit_length() - 1)
+        board ^= low_bit
+    return indices
+
+EXIT_BOARD_TABLES = tuple(board_table(lambda room_exits, direction=direction: bool(room_exits & direction)) 
+                          for direction in EXIT_DIRECTIONS)
+ACCESSIBLE_BOARD_TABLE = board_table(lambda flags: bool(flags & ROOM_ACCESSIBLE))
+# (direction, neighbor index, direction back) for every neighbor that is on the map, for loops over neighbors
+room_neighbors = tuple(tuple((direction, neighbor_table[index][EXIT_COLUMN[direction]], EXIT_OPPOSITES[direction]) 
+                             for direction in (EXIT_UP, EXIT_LEFT, EXIT_RIGHT, EXIT_DOWN) 
+                             if neighbor_table[index][EXIT_COLUMN[direction]] >= 0) 
+                       for index in range(MAP_SIZE))
+
+
+def build_template_variants() -> Dict[Tuple[bool, int], Tuple[int, ...]]:
+    # area_template flipped across the Y-axis (or not), then rotated counter-clockwise 0-3 times, as flat rows
+    variants: Dict[Tuple[bool, int], Tuple[int, ...]] = {}
+    for flip in (False, True):
+        division = [list(reversed(row)) if flip else list(row) for row in area_template]
+        for rotate in range(4):
+            variants[(flip, rotate)] = tuple(template_area for row in division for template_area in row)
+            # https://stackoverflow.com/questions/8421337/rotating-a-two-dimensional-array-in-python
+            division = [list(row) for row in reversed(list(zip(*division)))]
+    return variants
+
+
+def find_template_entrances(template: Tuple[int, ...]) -> Dict[int, List[Tuple[int, int]]]:
+    # Border rooms that could connect Area 0 to each template area, as (index, exit direction) in map order
+    entrances: Dict[int, List[Tuple[int, int]]] = {template_area: [] for template_area in range(1, 11)}
+    for index in range(MAP_SIZE):
+        if template[index] == -1:
+            down_area, right_area, left_area, up_area = (template[neighbor] if neighbor >= 0 else None 
+                                                         for neighbor in neighbor_table[index])
+            if up_area == 0 and down_area is not None and down_area > 0:
+                entrances[down_area].append((index, EXIT_UP))
+            if down_area == 0 and up_area is not None and up_area > 0:
+                entrances[up_area].append((index, EXIT_DOWN))
+            if left_area == 0 and right_area is not None and right_area > 0:
+                entrances[right_area].append((index, EXIT_LEFT))
+            if right_area == 0 and left_area is not None and left_area > 0:
+                entrances[left_area].append((index, EXIT_RIGHT))
+    return entrances
+
+# Only the area number shuffle depends on the seed, so every flip and rotation is worked out once up front
+template_variants = build_template_variants()
+template_entrances = {variant: find_template_entrances(template) for variant, template in template_variants.items()}
+
+
+# Room record encoding for writehex
+room_record_3 = struct.Struct(">BBB")
+room_record_4 = struct.Struct(">BBBB")
+room_block_set = struct.Struct(">H")
+# Rooms whose header only depends on the room type: (first byte, uses the "most rooms" area key, third byte)
+fixed_room_headers = {
+    TGLRoomType.SAVE:       (0x82, True,  0x01),  # (82) + (exits + roomkey) + (01)
+    TGLRoomType.TEXT:       (0xA3, False, 0x03),  # (A3) + (exits + roomkey) + (03) + (textid)
+    TGLRoomType.MULTISHOP:  (0xA3, False, 0x02),  # (A3) + (exits + roomkey) + (02) + (shopid)
+    TGLRoomType.SINGLESHOP: (0xA3, False, 0x06),  # (A3) + (exits + roomkey) + (06) + (shopid)
+}
+# First byte of NORMAL rooms by (has enemies, has a block set, has chip tiles): (roomtype + length)
+normal_room_headers = {(has_enemies, has_blocks, chip_tile): 
+                       ((7 << 4 if chip_tile else 1 << 4) if has_blocks else 0) + 2 + has_enemies + 2 * has_blocks 
+                       for has_enemies in (False, True) for has_blocks in (False, True) for chip_tile in (False, True)}
+# First byte of ITEM rooms by has enemies: (3 + length)
+item_room_headers = {False: 0x35, True: 0x36}
+# Decoding: total record length by first byte, and the room type of (A3) records by their third byte
+room_record_lengths = {header: (header & 0x0F) + 1 
+                       for header in list(normal_room_headers.values()) + list(item_room_headers.values())}
+room_record_lengths.update({0x82: 3, 0xA3: 4, 0x43: 4})
+text_shop_room_types = {0x03: TGLRoomType.TEXT, 0x02: TGLRoomType.MULTISHOP, 0x06: TGLRoomType.SINGLESHOP}
+
+
 class TGLRoom:
-    """Holds the various flags to determine room type and structure that will be used to generate the ROM code 
-    for the map structure."""
-    area: int  # In-game area, between 0 and 10, -1 and -2 are special flags
-    is_accessible: bool
-    is_startingpoint: bool  # If this room is a connection to Area 0
-    exits: TGLRoomExits  # Bitflag, order (little-endian) Down Right Left Up (DRLU)
-    avoid_special: bool
-    room_type: TGLRoomType
-    block_set: int  # For item rooms and normal rooms with blocks
-    chip_tile: bool  # Are there chip boxes?
-    content_id: int  # Item / Miniboss / Shop / Text id
-    enemy_type: int  # 0 is no enemies, 1-47 represent enemy groups
-
-    def __init__(self):
-        self.is_accessible = False
-        self.is_startingpoint = False
-        self.exits = TGLRoomExits.NONE
-        self.avoid_special = False
-        self.room_type = TGLRoomType.NORMAL
-        self.block_set = -1
-        self.chip_tile = False
-        self.enemy_type = 0
+    """A view of a single room in a TGLMap. The room data itself lives in the map's column arrays, 
+    addressed by index (y * 24 + x), so views are cheap to create and hold no state of their own."""
+    __slots__ = ("tglmap", "index")
 
-    def count_bytes(self) -> int:
-        if not self.is_accessible:
-            return 1
-        elif (self.room_type == TGLRoomType.SAVE) or (self.room_type == TGLRoomType.CORRIDOR):
-            return 3
-        elif ((self.room_type == TGLRoomType.TEXT) 
-              or (self.room_type == TGLRoomType.MULTISHOP)
-              or (self.room_type == TGLRoomType.SINGLESHOP)
-              or (self.room_type == TGLRoomType.MINIBOSS)):
-            return 4
+    def __init__(self, tglmap: "TGLMap", index: int):
+        self.tglmap = tglmap
+        self.index = index
+
+    @property
+    def x(self) -> int:
+        return self.index % MAP_WIDTH
+
+    @property
+    def y(self) -> int:
+        return self.index // MAP_WIDTH
+
+    def __get_flag(self, flag: TGLRoomFlags) -> bool:
+        return bool(self.tglmap.flags[self.index] & flag)
+
+    def __set_flag(self, flag: TGLRoomFlags, value: bool):
+        if value:
+            self.tglmap.set_flags(self.index, int(flag))
         else:
-            bytecount = 3
-            if (self.room_type == TGLRoomType.ITEM):
-                bytecount += 1
-            if self.block_set > 0:
-                bytecount += 2
-            if self.enemy_type != 0:
-                bytecount += 1
-            return bytecount
+            self.tglmap.clear_flags(self.index, int(flag))
+
+    @property
+    def area(self) -> int:  # In-game area, between 0 and 10, -1 and -2 are special flags
+        return self.tglmap.area[self.index]
+
+    @area.setter
+    def area(self, value: int):
+        self.tglmap.set_area(self.index, value)
+
+    @property
+    def is_accessible(self) -> bool:
+        return self.__get_flag(TGLRoomFlags.ACCESSIBLE)
+
+    @is_accessible.setter
+    def is_accessible(self, value: bool):
+        self.__set_flag(TGLRoomFlags.ACCESSIBLE, value)
+
+    @property
+    def is_startingpoint(self) -> bool:
+        return self.__get_flag(TGLRoomFlags.STARTINGPOINT)
+
+    @is_startingpoint.setter
+    def is_startingpoint(self, value: bool):
+        self.__set_flag(TGLRoomFlags.STARTINGPOINT, value)
+
+    @property
+    def avoid_special(self) -> bool:
+        return self.__get_flag(TGLRoomFlags.AVOID_SPECIAL)
+
+    @avoid_special.setter
+    def avoid_special(self, value: bool):
+        self.__set_flag(TGLRoomFlags.AVOID_SPECIAL, value)
+
+    @property
+    def chip_tile(self) -> bool:
+        return self.__get_flag(TGLRoomFlags.CHIP_TILE)
+
+    @chip_tile.setter
+    def chip_tile(self, value: bool):
+        self.__set_flag(TGLRoomFlags.CHIP_TILE, value)
+
+    @property
+    def exits(self) -> TGLRoomExits:  # Bitflag, order (little-endian) Down Right Left Up (DRLU)
+        return TGLRoomExits(self.tglmap.exits[self.index])
+
+    @exits.setter
+    def exits(self, value: int):
+        self.tglmap.exits[self.index] = value
+
+    @property
+    def room_type(self) -> TGLRoomType:
+        return TGLRoomType(self.tglmap.room_type[self.index])
+
+    @room_type.setter
+    def room_type(self, value: int):
+        self.tglmap.set_room_type(self.index, value)
+
+    @property
+    def block_set(self) -> int:  # For item rooms and normal rooms with blocks
+        return self.tglmap.block_set[self.index]
+
+    @block_set.setter
+    def block_set(self, value: int):
+        self.tglmap.set_block_set(self.index, value)
+
+    @property
+    def content_id(self) -> int:  # Item / Miniboss / Shop / Text id
+        return self.tglmap.content_id[self.index]
+
+    @content_id.setter
+    def content_id(self, value: int):
+        self.tglmap.content_id[self.index] = value
+
+    @property
+    def enemy_type(self) -> int:  # 0 is no enemies, 1-47 represent enemy groups
+        return self.tglmap.enemy_type[self.index]
+
+    @enemy_type.setter
+    def enemy_type(self, value: int):
+        self.tglmap.set_enemy_type(self.index, value)
+
+    def count_bytes(self) -> int:
+        return self.tglmap.count_room_bytes(self.index)
     
     def print_room(self):
         print("Room Data START:")
@@ -198,7 +498,7 @@ class TGLRoom:
             print("Avoid Special")
         if self.chip_tile:
             print("Has chips")
-        if hasattr(self, "content_id"):
+        if self.room_type != TGLRoomType.NORMAL:
             print("Content ID: " + str(self.content_id))
         print("Block set: " + str(self.block_set))
         print("Enemy type: " + str(self.enemy_type))
@@ -215,114 +515,249 @@ class TGLRoom:
         print("Room Data END")
         print("")
 
+def new_map_stats() -> Dict[str, Any]:
+    # Everything an instrumented TGLMap records while randomizing, for logging and benchmarks
+    return {
+        "phase_seconds": {},  # Phase name -> seconds
+        "areas": [{} for _ in range(11)],  # Rooms and connections requested and actually made, per area
+        "failed_attempts": [],  # Exception names of whole map attempts that failed before this one
+        "map_bytes": 0,
+    }
+
+
 class TGLMap:
-    """Contains a List of Lists of Rooms representing the map data for the TGL ROM.
+    """Contains the map data for the TGL ROM as flat, index-addressed columns (index = y * 24 + x), 
+    one typed array per room property. TGLRoom views can be taken over any index for convenience.
     The Map in ROM is represented as a continuous string, starting at X0 Y0 and proceeding row by row to X23 Y23."""
     areakeys_other: List = [0,1,1,2,3,4,4,5,5,6,7]  # used in room data to determine which panel locks exist
     areakeys_mostrooms: List = [8,9,9,10,11,12,12,13,13,14,15] # "KeyForAreaForRoomsThatCouldHaveEnemiesButDont"
 
-    def __init__(self):
-        self.mapdata: List[List[TGLRoom]] = [[TGLRoom() for _ in range(24)] for _ in range(24)]
+    def __init__(self, instrument: bool = False):
+        # instrument: Collect timing and work counters for each phase of randomize into stats
+        self.area = array("b", [-1]) * MAP_SIZE
+        self.exits = bytearray(MAP_SIZE)
+        self.room_type = bytearray(MAP_SIZE)
+        self.block_set = array("i", [-1]) * MAP_SIZE
+        self.content_id = bytearray(MAP_SIZE)
+        self.enemy_type = bytearray(MAP_SIZE)
+        self.flags = bytearray(MAP_SIZE)
+        # Per-area room index, sorted in map order so random choices match a full map scan.
+        # Kept up to date by the setters below, so area, flags, room_type and block_set must only change through them.
+        self.area_rooms: List[List[int]] = [[] for _ in range(11)]  # Accessible rooms
+        self.area_starting_points: List[List[int]] = [[] for _ in range(11)]
+        self.area_suitable: List[List[int]] = [[] for _ in range(11)]  # Rooms that can still hold something special
+        self.__indexed = bytearray(MAP_SIZE)  # Which of the lists above each room is currently in
+        self.__indexed_area = array("b", [-1]) * MAP_SIZE
+        # Encoded size of every room, kept up to date by the setters along with the running total for the whole map
+        self.room_bytes = bytearray(b"\x01") * MAP_SIZE
+        self.byte_count: int = MAP_SIZE
+        # Generic location ID -> original location and coordinates, recorded as special rooms are placed
+        self.locations: Dict[int, TGLMapLocation] = {}
+        self.one_way_exits: List[Tuple[int, int]] = []  # (index, direction) of exits deliberately left one-way
+        self.attempts: Dict[str, int] = {}  # How many tries each retried step of randomization needed
+        self.stats: Optional[Dict[str, Any]] = new_map_stats() if instrument else None
+        self.__phase_start: float = 0.0
 
-    def writehex(self) -> bytearray:
-        outbytes = bytearray()
-        for ycoord in self.mapdata:
-            for xcoord in ycoord:
-                if xcoord.is_accessible:
-                    # Each room has a unique string length and values based on contents
-                    # Most rooms are constructed from nybbles of data, represented in comments by (x + y)
-                    if xcoord.area < 0:
-                        # No room in Area -1 should be accessible. Print it and fail
-                        xcoord.print_room()
-                        raise Exception("TGL Map Rando: Accessible room with Area < 0 generated.") 
-                    exits_shift = xcoord.exits << 4
-                    if xcoord.room_type == TGLRoomType.NORMAL:
-                        # (roomtype + length) + (exits + roomkey) + (0 + area) + (enemy) + (blocks)
-                        roomlength = 2
-                        roomkey = self.areakeys_other[xcoord.area]
-                        roomtype = 0
-                        if xcoord.enemy_type != 0:
-                            roomkey = self.areakeys_mostrooms[xcoord.area]
-                            roomlength += 1
-                        if xcoord.block_set >= 0:
-                            roomlength += 2
-                            if xcoord.chip_tile:
-                                roomtype = 7 << 4
-                            else:
-                                roomtype = 1 << 4
-                        outbytes.append(roomtype + roomlength)
-                        outbytes.append(exits_shift + roomkey)
-                        outbytes.append(xcoord.area)
-                        if xcoord.enemy_type != 0:
-                            outbytes.append(xcoord.enemy_type)
-                        if xcoord.block_set > 0:
-                            # Block sets are 2 bytes
-                            block_bytes = xcoord.block_set.to_bytes(2, "big")
-                            outbytes.append(block_bytes[0])
-                            outbytes.append(block_bytes[1])
-                    elif xcoord.room_type == TGLRoomType.SAVE:
-                        # (82) + (exits + roomkey) + (01)
-                        outbytes.append(0x82)
-                        outbytes.append(exits_shift + self.areakeys_mostrooms[xcoord.area])
-                        outbytes.append(0x01)
-                    elif xcoord.room_type == TGLRoomType.CORRIDOR:
-                        # (82) + (exits + roomkey) + (corridor)
-                        roomkey = self.areakeys_mostrooms[xcoord.area]
-                        if xcoord.content_id == 1:
-                            roomkey = 0
-                        outbytes.append(0x82)
-                        outbytes.append(exits_shift + roomkey)
-                        outbytes.append(0x80 + xcoord.content_id)
-                    elif xcoord.room_type == TGLRoomType.TEXT:
-                        # (A3) + (exits + roomkey) + (03) + (textid)
-                        outbytes.append(0xA3)
-                        outbytes.append(exits_shift + self.areakeys_other[xcoord.area])
-                        outbytes.append(0x03)
-                        outbytes.append(xcoord.content_id)
-                    elif xcoord.room_type == TGLRoomType.MULTISHOP:
-                        # (A3) + (exits + roomkey) + (02) + (shopid)
-                        outbytes.append(0xA3)
-                        outbytes.append(exits_shift + self.areakeys_other[xcoord.area])
-                        outbytes.append(0x02)
-                        outbytes.append(xcoord.content_id)
-                    elif xcoord.room_type == TGLRoomType.SINGLESHOP:
-                        # (A3) + (exits + roomkey) + (06) + (shopid)
-                        outbytes.append(0xA3)
-                        outbytes.append(exits_shift + self.areakeys_other[xcoord.area])
-                        outbytes.append(0x06)
-                        outbytes.append(xcoord.content_id)
-                    elif xcoord.room_type == TGLRoomType.MINIBOSS:
-                        # (43) + (exits + roomkey) + (1 + area) + (contents)
-                        outbytes.append(0x43)
-                        outbytes.append(exits_shift + self.areakeys_mostrooms[xcoord.area])
-                        outbytes.append(0x10 + xcoord.area)
-                        outbytes.append(xcoord.content_id)
-                    elif xcoord.room_type == TGLRoomType.ITEM:
-                        # (3 + length) + (exits + roomkey) + (0 + area) + (contents) + (enemy) + (blocks)
-                        roomkey = self.areakeys_other[xcoord.area]
-                        roomlength = 5
-                        if xcoord.enemy_type != 0:
-                            roomkey = self.areakeys_mostrooms[xcoord.area]
-                            roomlength += 1
-                        outbytes.append(0x30 + roomlength)
-                        outbytes.append(exits_shift + roomkey)
-                        outbytes.append(xcoord.area)
-                        outbytes.append(xcoord.content_id)
-                        if xcoord.enemy_type != 0:
-                            outbytes.append(xcoord.enemy_type)
-                        # Block sets are 2 bytes
-                        block_bytes = xcoord.block_set.to_bytes(2, "big")
-                        outbytes.append(block_bytes[0])
-                        outbytes.append(block_bytes[1])
+    def room(self, xcoord: int, ycoord: int) -> TGLRoom:
+        return TGLRoom(self, ycoord * MAP_WIDTH + xcoord)
+
+    @property
+    def mapdata(self) -> List[List[TGLRoom]]:
+        # Row-by-row room views, for anything that still wants to walk the map as a grid
+        return [[TGLRoom(self, ykey * MAP_WIDTH + xkey) for xkey in range(MAP_WIDTH)] for ykey in range(MAP_HEIGHT)]
+
+    def set_area(self, index: int, area: int):
+        self.area[index] = area
+        self.__update_index(index)
+
+    def set_flags(self, index: int, flags: int):
+        self.flags[index] |= flags
+        if flags & INDEXED_FLAGS:
+            self.__update_index(index)
+        if flags & ROOM_ACCESSIBLE:
+            self.__update_bytes(index)
+
+    def clear_flags(self, index: int, flags: int):
+        self.flags[index] &= ~flags
+        if flags & INDEXED_FLAGS:
+            self.__update_index(index)
+        if flags & ROOM_ACCESSIBLE:
+            self.__update_bytes(index)
+
+    def set_room_type(self, index: int, room_type: int):
+        self.room_type[index] = room_type
+        self.__update_index(index)
+        self.__update_bytes(index)
+
+    def set_block_set(self, index: int, block_set: int):
+        self.block_set[index] = block_set
+        self.__update_index(index)
+        self.__update_bytes(index)
+
+    def set_enemy_type(self, index: int, enemy_type: int):
+        self.enemy_type[index] = enemy_type
+        self.__update_bytes(index)
+
+    def bytes_free(self) -> int:
+        # Room data space left in ROM for the map as it stands
+        return MAP_DATA_MAX_BYTES - self.byte_count
+
+    def __update_bytes(self, index: int):
+        bytecount = self.count_room_bytes(index)
+        self.byte_count += bytecount - self.room_bytes[index]
+        self.room_bytes[index] = bytecount
+
+    def __update_index(self, index: int):
+        area = self.area[index]
+        flags = self.flags[index]
+        indexed = 0
+        if (area >= 0) and (flags & ROOM_ACCESSIBLE):
+            indexed |= INDEX_ROOMS
+            if flags & ROOM_STARTINGPOINT:
+                indexed |= INDEX_STARTING_POINT
+            room_type = self.room_type[index]
+            if (self.block_set[index] == -1) and \
+                ((room_type == TGLRoomType.NORMAL) or 
+                 ((area != 0) and (room_type == TGLRoomType.SAVE) and (flags & ROOM_STARTINGPOINT))):
+                if (area != 0) or not (flags & ROOM_STARTINGPOINT):
+                    indexed |= INDEX_SUITABLE
+        old_indexed = self.__indexed[index]
+        old_area = self.__indexed_area[index]
+        if (indexed == old_indexed) and ((area == old_area) or not indexed):
+            return
+        for bit, rooms in ((INDEX_ROOMS, self.area_rooms), 
+                           (INDEX_STARTING_POINT, self.area_starting_points),
+                           (INDEX_SUITABLE, self.area_suitable)):
+            if old_indexed & bit:
+                area_list = rooms[old_area]
+                del area_list[bisect_left(area_list, index)]
+            if indexed & bit:
+                insort(rooms[area], index)
+        self.__indexed[index] = indexed
+        self.__indexed_area[index] = area
+
+    def __exit_boards(self) -> Tuple[int, ...]:
+        # One bitboard per exit direction (Down Right Left Up), with a bit set for every room that has that exit
+        return tuple(to_board(self.exits, table) for table in EXIT_BOARD_TABLES)
+
+    def find_unreachable_rooms(self, room_types: Tuple[int, ...] = (TGLRoomType.ITEM, TGLRoomType.MINIBOSS, 
+                                                                    TGLRoomType.MULTISHOP, TGLRoomType.SINGLESHOP, 
+                                                                    TGLRoomType.CORRIDOR)) -> List[int]:
+        # Flood fill from the starting text room along exits, then list any accessible rooms of the given types
+        #  that were never reached
+        down, right, left, up = self.__exit_boards()
+        reached = 1 << MAP_START_ROOM
+        frontier = reached
+        while frontier:
+            grown = ((((frontier & down) << MAP_WIDTH) & BOARD_FULL) 
+                     | ((frontier & up) >> MAP_WIDTH) 
+                     | (((frontier & right) << 1) & BOARD_NOT_LEFT_EDGE) 
+                     | (((frontier & left) >> 1) & BOARD_NOT_RIGHT_EDGE))
+            frontier = grown & ~reached
+            reached |= frontier
+        return board_indices(to_board(self.flags, ACCESSIBLE_BOARD_TABLE) 
+                             & to_board(self.room_type, board_table(lambda room_type: room_type in room_types)) 
+                             & ~reached)
+
+    def find_one_way_exits(self) -> List[Tuple[int, int]]:
+        # (index, direction) of every exit with no exit back from the other side, including exits off the map
+        down, right, left, up = self.__exit_boards()
+        one_way = (down & ~(up >> MAP_WIDTH), 
+                   right & ~((left >> 1) & BOARD_NOT_RIGHT_EDGE), 
+                   left & ~((right << 1) & BOARD_NOT_LEFT_EDGE), 
+                   up & ~((down << MAP_WIDTH) & BOARD_FULL))
+        return sorted((index, EXIT_DIRECTIONS[column]) 
+                      for column in range(4) for index in board_indices(one_way[column]))
+
+    def get_starting_points(self) -> List[int]:
+        # Starting points of every area except Area 0, in map order
+        return sorted(index for area in range(1, 11) for index in self.area_starting_points[area])
+
+    def count_room_bytes(self, index: int) -> int:
+        if not (self.flags[index] & ROOM_ACCESSIBLE):
+            return 1
+        room_type = self.room_type[index]
+        if (room_type == TGLRoomType.SAVE) or (room_type == TGLRoomType.CORRIDOR):
+            return 3
+        elif ((room_type == TGLRoomType.TEXT) 
+              or (room_type == TGLRoomType.MULTISHOP)
+              or (room_type == TGLRoomType.SINGLESHOP)
+              or (room_type == TGLRoomType.MINIBOSS)):
+            return 4
+        else:
+            bytecount = 3
+            if (room_type == TGLRoomType.ITEM):
+                bytecount += 1
+            if self.block_set[index] > 0:
+                bytecount += 2
+            if self.enemy_type[index] != 0:
+                bytecount += 1
+            return bytecount
+
+    def writehex(self) -> bytes:
+        # Each room has a unique string length and values based on contents
+        # Most rooms are constructed from nybbles of data, represented in comments by (x + y)
+        # The size of every room is already known, so the buffer is allocated once and rooms are packed into it.
+        # Inaccessible rooms in array are noted with 0x80 single byte, so those are left as filled in here
+        outbytes = bytearray(b"\x80") * (self.byte_count + 1)
+        offset = 0
+        flags = self.flags
+        room_bytes = self.room_bytes
+        for index in range(MAP_SIZE):
+            if flags[index] & ROOM_ACCESSIBLE:
+                area = self.area[index]
+                if area < 0:
+                    # No room in Area -1 should be accessible. Print it and fail
+                    TGLRoom(self, index).print_room()
+                    raise Exception("TGL Map Rando: Accessible room with Area < 0 generated.") 
+                room_type = self.room_type[index]
+                exits_shift = self.exits[index] << 4
+                if room_type in fixed_room_headers:
+                    first_byte, mostrooms_key, third_byte = fixed_room_headers[room_type]
+                    roomkey = self.areakeys_mostrooms[area] if mostrooms_key else self.areakeys_other[area]
+                    if room_type == TGLRoomType.SAVE:
+                        room_record_3.pack_into(outbytes, offset, first_byte, exits_shift + roomkey, third_byte)
+                    else:
+                        room_record_4.pack_into(outbytes, offset, first_byte, exits_shift + roomkey, third_byte, 
+                                                self.content_id[index])
+                elif room_type == TGLRoomType.CORRIDOR:
+                    # (82) + (exits + roomkey) + (corridor)
+                    content_id = self.content_id[index]
+                    roomkey = 0 if content_id == 1 else self.areakeys_mostrooms[area]
+                    room_record_3.pack_into(outbytes, offset, 0x82, exits_shift + roomkey, 0x80 + content_id)
+                elif room_type == TGLRoomType.MINIBOSS:
+                    # (43) + (exits + roomkey) + (1 + area) + (contents)
+                    room_record_4.pack_into(outbytes, offset, 0x43, exits_shift + self.areakeys_mostrooms[area], 
+                                            0x10 + area, self.content_id[index])
+                elif (room_type == TGLRoomType.NORMAL) or (room_type == TGLRoomType.ITEM):
+                    # NORMAL: (roomtype + length) + (exits + roomkey) + (0 + area) + (enemy) + (blocks)
+                    # ITEM:   (3 + length) + (exits + roomkey) + (0 + area) + (contents) + (enemy) + (blocks)
+                    enemy_type = self.enemy_type[index]
+                    block_set = self.block_set[index]
+                    roomkey = self.areakeys_mostrooms[area] if enemy_type else self.areakeys_other[area]
+                    if room_type == TGLRoomType.ITEM:
+                        header = item_room_headers[enemy_type != 0]
                     else:
-                        # Something went wrong...
-                        raise Exception("TGL Map Rando: writehex() failed, Invalid Room Type found.")
+                        header = normal_room_headers[(enemy_type != 0, block_set >= 0, 
+                                                      bool(flags[index] & ROOM_CHIP_TILE))]
+                    room_record_3.pack_into(outbytes, offset, header, exits_shift + roomkey, area)
+                    position = offset + 3
+                    if room_type == TGLRoomType.ITEM:
+                        outbytes[position] = self.content_id[index]
+                        position += 1
+                    if enemy_type != 0:
+                        outbytes[position] = enemy_type
+                        position += 1
+                    # Block sets are 2 bytes, item rooms always have one
+                    if (block_set > 0) or (room_type == TGLRoomType.ITEM):
+                        room_block_set.pack_into(outbytes, position, block_set)
                 else:
-                    # Inaccessible rooms in array are noted with 0x80 single byte
-                    outbytes.append(0x80)
-        outbytes.append(0x0) # End the room data table with a null terminator 
-        return outbytes
-    
+                    # Something went wrong...
+                    raise Exception("TGL Map Rando: writehex() failed, Invalid Room Type found.")
+            offset += room_bytes[index]
+        outbytes[offset] = 0x0 # End the room data table with a null terminator 
+        return bytes(outbytes)
+
     def print_maps(self):
         print(" List of Areas START:")
         for ycoord in self.mapdata:
@@ -355,13 +790,13 @@ class TGLMap:
                 for xcoord in ycoord:
                     if i == 0:
                         row += "╔═"
-                        if (xcoord.exits & TGLRoomExits.UP):
+                        if (xcoord.exits & EXIT_UP):
                             row += "░░"
                         else: 
                             row += "══"
                         row += "═╗"
                     if i == 1:
-                        if (xcoord.exits & TGLRoomExits.LEFT):
+                        if (xcoord.exits & EXIT_LEFT):
                             row += "░░"
                         else:
                             row += "║║"
@@ -394,13 +829,13 @@ class TGLMap:
                                 row += "░░"
                         else:
                             row += "╬╬"
-                        if (xcoord.exits & TGLRoomExits.RIGHT):
+                        if (xcoord.exits & EXIT_RIGHT):
                             row += "░░"
                         else:
                             row += "║║"
                     if i == 2:
                         row += "╚═"
-                        if (xcoord.exits & TGLRoomExits.DOWN):
+                        if (xcoord.exits & EXIT_DOWN):
                             row += "░░"
                         else: row += "══"
                         row += "═╝"
@@ -411,359 +846,409 @@ class TGLMap:
     # Extract the data for where each item location ID was randomized to
     # Outputs a dict with the generic location ID as a key, 
     #  and the assoicated in game location ID and the XY coordinates (for entrance hints) as data. 
-    def get_randomized_item_locations(self) -> Dict[int, Tuple[int, int, int]]:
-        item_location_table: Dict[int, Tuple[int, int, int]] = {} # output dict
-        area_item_data: List[List[Tuple[int, int, int]]] = [[],[],[],[],[],[],[],[],[],[],[],[]] # item data per area
-        area_miniboss_data: List[List[Tuple[int, int, int]]] = [[],[],[],[],[],[],[],[],[],[],[],[]] # miniboss data
-        # translate the room content_ids to location ids
-        shop_translation = {0x3A: 2, 0x3B: 5, 0x3C: 8, 0x3D: 11, 0x3E: 14, 
-                            0x3F: 102, 0x40: 107, 0x41: 112, 0x42: 117, 0x43: 122}
-        ykey = 0
-        # Build the data by iterating over the map table
-        for ycoord in self.mapdata:
-            xkey = 0
-            for xcoord in ycoord:
-                # store the item/miniboss data per area as a tuple(itemid, X, Y)
-                # for now, shops are tied to area so just add them directly
-                if xcoord.room_type == TGLRoomType.ITEM:                   
-                    area_item_data[xcoord.area].append((xcoord.content_id, xkey, ykey))
-                elif xcoord.room_type == TGLRoomType.MINIBOSS:
-                    area_miniboss_data[xcoord.area].append((xcoord.content_id, xkey, ykey))
-                elif (xcoord.room_type == TGLRoomType.SINGLESHOP) or (xcoord.room_type == TGLRoomType.MULTISHOP):
-                    # We know single shops are in A0 so just add the info directly
-                    shop_location = shop_translation[xcoord.content_id]
-                    item_location_table[TGL_LOCID_SHOP_GENERIC + shop_location] = \
-                        (TGL_LOCID_SHOP + shop_location, xkey, ykey)
-                # Corridor 21 is a room, but has no item, so don't log it as a location
-                elif (xcoord.room_type == TGLRoomType.CORRIDOR):
-                    if xcoord.content_id < 21:
-                        item_location_table[TGL_LOCID_CORRIDOR_GENERIC + xcoord.content_id] = \
-                            (TGL_LOCID_CORRIDOR + xcoord.content_id, xkey, ykey)
-                        item_location_table[TGL_LOCID_BONUS_GENERIC + xcoord.content_id] = \
-                            (TGL_LOCID_BONUS + xcoord.content_id, xkey, ykey)
-
-                xkey += 1
-            ykey += 1
-        # We only know how many items per area after sweeping the map, so use the indices to generate location ids
-        for arealist in area_item_data:
-            assert (len(arealist) <= 6) # No area should have more than 6 items
-            for item_data in arealist:
-                # Generic ground loc IDs are (generic offset + area*10 + index+3)
-                generic_location_id = (TGL_LOCID_GROUND_GENERIC 
-                                       + (area_item_data.index(arealist) * 10) 
-                                       + (arealist.index(item_data) + 3))
-                item_location_table[generic_location_id] = (TGL_LOCID_GROUND + item_data[0], 
-                                                            item_data[1], 
-                                                            item_data[2])
-        for arealist in area_miniboss_data:
-            assert (len(arealist) <= 3) # No area should have more than 3 minibosses
-            for item_data in arealist:
-                # Generic miniboss loc IDs are (generic offset + area*10 + index)
-                generic_location_id = (TGL_LOCID_GROUND_GENERIC 
-                                       + (area_miniboss_data.index(arealist) * 10) 
-                                       + (arealist.index(item_data)))
-                item_location_table[generic_location_id] = (TGL_LOCID_GROUND + item_data[0], 
-                                                            item_data[1], 
-                                                            item_data[2])
-        return item_location_table
+    def snapshot(self) -> TGLMapSnapshot:
+        return TGLMapSnapshot.from_locations(self.writehex(), self.locations)
+
+    def get_randomized_item_locations(self) -> Dict[int, TGLMapLocation]:
+        return self.locations
+
+    @classmethod
+    def from_bytes(cls, data: bytes, offset: int = 0) -> "TGLMap":
+        """Rebuilds a map from room data in the format writehex produces, starting at offset.
+        Only what the ROM format holds comes back: starting point and avoid special flags are not stored, and the
+        area of rooms with no area byte is worked out from their area key and the rooms they connect to."""
+        tglmap = cls()
+        area_keys: Dict[int, List[int]] = {}  # Rooms with no area byte -> the areas their key could belong to
+        for index in range(MAP_SIZE):
+            if offset >= len(data):
+                raise ValueError(f"TGL Map: Room data ends before room {index} of {MAP_SIZE}.")
+            first_byte = data[offset]
+            if first_byte == 0x80:
+                # Inaccessible room
+                offset += 1
+                continue
+            if first_byte == 0x00:
+                raise ValueError(f"TGL Map: Room data terminated after {index} of {MAP_SIZE} rooms.")
+            room_length = room_record_lengths.get(first_byte)
+            if room_length is None:
+                raise ValueError(f"TGL Map: Invalid room record {first_byte:#04x} for room {index}.")
+            record = data[offset:offset + room_length]
+            if len(record) < room_length:
+                raise ValueError(f"TGL Map: Room data ends in the middle of room {index}.")
+            offset += room_length
+            tglmap.flags[index] = ROOM_ACCESSIBLE
+            tglmap.exits[index] = record[1] >> 4
+            roomkey = record[1] & 0x0F
+            if (first_byte >> 4) in (0x0, 0x1, 0x7):
+                # (roomtype + length) + (exits + roomkey) + (0 + area) + (enemy) + (blocks)
+                tglmap.room_type[index] = TGLRoomType.NORMAL
+                tglmap.area[index] = record[2]
+                if first_byte & 0x01:
+                    tglmap.enemy_type[index] = record[3]
+                if (first_byte & 0x0F) >= 4:
+                    tglmap.block_set[index] = room_block_set.unpack_from(record, room_length - 2)[0]
+                if (first_byte >> 4) == 0x7:
+                    tglmap.flags[index] |= ROOM_CHIP_TILE
+            elif (first_byte >> 4) == 0x3:
+                # (3 + length) + (exits + roomkey) + (0 + area) + (contents) + (enemy) + (blocks)
+                tglmap.room_type[index] = TGLRoomType.ITEM
+                tglmap.area[index] = record[2]
+                tglmap.content_id[index] = record[3]
+                if room_length == 7:
+                    tglmap.enemy_type[index] = record[4]
+                tglmap.block_set[index] = room_block_set.unpack_from(record, room_length - 2)[0]
+            elif first_byte == 0x43:
+                # (43) + (exits + roomkey) + (1 + area) + (contents)
+                tglmap.room_type[index] = TGLRoomType.MINIBOSS
+                tglmap.area[index] = record[2] - 0x10
+                tglmap.content_id[index] = record[3]
+            elif first_byte == 0x82:
+                if record[2] == 0x01:
+                    # (82) + (exits + roomkey) + (01)
+                    tglmap.room_type[index] = TGLRoomType.SAVE
+                else:
+                    # (82) + (exits + roomkey) + (corridor)
+                    tglmap.room_type[index] = TGLRoomType.CORRIDOR
+                    tglmap.content_id[index] = record[2] - 0x80
+                area_keys[index] = ([1] if tglmap.content_id[index] == 1 else 
+                                    [area for area, key in enumerate(cls.areakeys_mostrooms) if key == roomkey])
+            else:
+                # (A3) + (exits + roomkey) + (type) + (id)
+                if record[2] not in text_shop_room_types:
+                    raise ValueError(f"TGL Map: Invalid text or shop room type {record[2]:#04x} for room {index}.")
+                tglmap.room_type[index] = text_shop_room_types[record[2]]
+                tglmap.content_id[index] = record[3]
+                area_keys[index] = [area for area, key in enumerate(cls.areakeys_other) if key == roomkey]
+        if (offset >= len(data)) or (data[offset] != 0x00):
+            raise ValueError(f"TGL Map: Room data for {MAP_SIZE} rooms is not followed by a terminator.")
+        tglmap.__resolve_areas(area_keys)
+
+        # Rebuild the index, sizes and location table from the decoded columns
+        item_rooms: List[List[int]] = [[] for _ in range(11)]
+        miniboss_rooms: List[List[int]] = [[] for _ in range(11)]
+        for index in range(MAP_SIZE):
+            if tglmap.flags[index] & ROOM_ACCESSIBLE:
+                tglmap.__update_index(index)
+                tglmap.__update_bytes(index)
+                room_type = tglmap.room_type[index]
+                if room_type == TGLRoomType.ITEM:
+                    item_rooms[tglmap.area[index]].append(index)
+                elif room_type == TGLRoomType.MINIBOSS:
+                    miniboss_rooms[tglmap.area[index]].append(index)
+                else:
+                    tglmap.__record_location(index)
+        for area in range(11):
+            tglmap.__record_area_items(area, item_rooms[area], miniboss_rooms[area])
+        tglmap.locations = dict(sorted(tglmap.locations.items()))
+        # Map data that was generated and validated only has one-way exits that were left that way on purpose
+        tglmap.one_way_exits = tglmap.find_one_way_exits()
+        return tglmap
+
+    def __resolve_areas(self, area_keys: Dict[int, List[int]]):
+        # Area keys are shared by some pairs of areas, so settle those rooms from the areas of rooms they connect to
+        unresolved: Dict[int, List[int]] = {}
+        for index, areas in area_keys.items():
+            self.area[index] = areas[0]
+            if len(areas) > 1:
+                unresolved[index] = areas
+        while unresolved:
+            resolved = [index for index, areas in unresolved.items() 
+                        if any((self.exits[index] & direction) and (neighbor not in unresolved) 
+                               and (self.area[neighbor] in areas) 
+                               for direction, neighbor, _ in room_neighbors[index])]
+            if not resolved:
+                # Nothing left to go on, keep the first possible area
+                break
+            for index in resolved:
+                self.area[index] = next(self.area[neighbor] for direction, neighbor, _ in room_neighbors[index] 
+                                        if (self.exits[index] & direction) and (neighbor not in unresolved) 
+                                        and (self.area[neighbor] in unresolved[index]))
+            for index in resolved:
+                del unresolved[index]
+
+    def __add_location(self, generic_location_id: int, location_id: int, index: int):
+        ykey, xkey = divmod(index, MAP_WIDTH)
+        self.locations[generic_location_id] = TGLMapLocation(location_id, xkey, ykey)
 
 
     # This is the core function to DO ALL THE THINGS to the map, proceed through helper functions to randomize map
     def randomizeMap(self, world: "TGLWorld"):
+        self.randomize(world.random, world.options.map_layout.value)
+
+    def randomize(self, random: Random, layout: int = MAP_LAYOUT_GROWTH):
+        self.__start_phase()
+        # Every phase, and every area within a phase, draws from its own stream derived from a single map seed.
+        # Changing how much one of them draws doesn't shift any of the others, so each can be replayed on its own.
+        map_seed = random.getrandbits(64)
+        random = map_stream(map_seed, MAP_STREAM_SHUFFLE)
         # Subdivide the map into areas from A0, and shuffle them
-        choose_flip: bool = world.random.choice([True, False])
-        choose_rotation: int = world.random.randint(0,3)
+        choose_flip: bool = random.choice([True, False])
+        choose_rotation: int = random.randint(0,3)
         areas = list(range(1,11))
-        world.random.shuffle(areas)
-        self.__shuffle_areas(choose_flip, choose_rotation, areas)
+        random.shuffle(areas)
+        possible_entrances = self.__shuffle_areas(choose_flip, choose_rotation, areas)
+        self.__end_phase("shuffle")
 
         # Need to place cardinal direction rooms before starting points to not break calculations (from Fireball)
         self.__grow_area_zero()
+        self.__end_phase("area_zero_growth")
         self.__place_cardinal_points()
-        self.__find_starting_points(world)
+        self.__end_phase("cardinal_points")
+        self.__find_starting_points(map_stream(map_seed, MAP_STREAM_STARTING_POINTS), possible_entrances)
+        self.__end_phase("starting_points")
 
         # Fill in each area
         for area in areas:
-            areasize = world.random.randint(18,25)
-            self.__grow_area(world, area, areasize)
-            self.__add_connections(world, area, 3, False, False)
-            self.__add_connections(world, area, 0, True, False)
+            area_random = map_stream(map_seed, MAP_STREAM_LAYOUT, area)
+            areasize = area_random.randint(18,25)
+            self.__layout_area(area_random, layout, area, areasize, 3)
 
         # Fill in A0
-        self.__grow_area(world, 0, 50)
-        self.__add_connections(world, 0, 6, False, False)
-        self.__add_connections(world, 0, 0, True, False)
+        self.__layout_area(map_stream(map_seed, MAP_STREAM_LAYOUT, 0), layout, 0, 50, 6)
 
         # Fill in non-item stuff
         self.__place_starting_points()
-        self.__place_area_decorations(world)
+        self.__end_phase("placement")
+        self.__place_area_decorations(map_stream(map_seed, MAP_STREAM_AREA_DECORATIONS))
+        self.__end_phase("decorations")
 
         # Starting room (and connecting rooms)
         self.__place_starting_text_room()
 
         for area in range(11):
-            self.__place_important_rooms(world, area)
-            self.__place_item_locations(world, area)
-            self.__place_safe_rooms(world, area)
+            area_random = map_stream(map_seed, MAP_STREAM_PLACEMENT, area)
+            self.__place_important_rooms(area_random, area)
+            self.__place_item_locations(area_random, area)
+            self.__place_safe_rooms(area_random, area)
+        self.locations = dict(sorted(self.locations.items()))
+        self.__end_phase("placement")
 
-        self.__place_corridor_decorations(world)
-        self.__place_random_decorations(world)
+        # Nothing after this point changes exits
+        self.__validate_connectivity()
+        self.__end_phase("validation")
 
-        self.__populate_enemies(world)
-        mapsize: int = self.__count_bytes()
-        #print("Map Size: " + str(mapsize))
-        if mapsize > 1916:
-            raise Exception("TGL Map Randomizer: Map size in Bytes is too large to fit in ROM.")
+        # A map that the finishing touches push over the size limit is thrown away as a whole, like any other failure
+        self.__finish_map(map_stream(map_seed, MAP_STREAM_FINISHING))
+        self.__end_phase("decorations")
+        if self.stats is not None:
+            self.stats["map_bytes"] = self.byte_count
 
-    def __count_bytes(self) -> int:
-        bytecount: int = 0
-        for ycoord in self.mapdata:
-            for xcoord in ycoord:
-                bytecount += xcoord.count_bytes()
-        return bytecount
+    def __start_phase(self):
+        if self.stats is not None:
+            self.__phase_start = time.perf_counter()
+
+    def __end_phase(self, phase: str):
+        # Time since the last phase ended is added to this phase, as some phases are split up by others
+        if self.stats is not None:
+            phase_end = time.perf_counter()
+            phase_seconds = self.stats["phase_seconds"]
+            phase_seconds[phase] = phase_seconds.get(phase, 0.0) + (phase_end - self.__phase_start)
+            self.__phase_start = phase_end
 
-    def __shuffle_areas(self, flip: bool, rotate: int, shuffled_areas: List[int]):
+    def __validate_connectivity(self):
+        unreachable = self.find_unreachable_rooms()
+        if unreachable:
+            rooms = [divmod(index, MAP_WIDTH) for index in unreachable]
+            raise TGLMapConnectivityError(f"TGL Map Rando: Rooms at {rooms} (Y, X) can't be reached from the start.")
+        one_way = [exit for exit in self.find_one_way_exits() if exit not in self.one_way_exits]
+        if one_way:
+            raise TGLMapConnectivityError(f"TGL Map Rando: Exits at {one_way} (index, direction) have no way back.")
+
+    def __layout_area(self, random: Random, layout: int, area: int, total_size: int, connection_count: int):
+        if layout == MAP_LAYOUT_SPANNING_TREE:
+            rooms_grown = self.__grow_spanning_tree(random, area, total_size)
+        else:
+            rooms_grown = self.__grow_area(random, area, total_size)
+        self.__end_phase("area_growth")
+        connections_made = self.__add_connections(random, area, connection_count, False, False)
+        if layout != MAP_LAYOUT_SPANNING_TREE:
+            self.__add_connections(random, area, 0, True, False)
+        self.__end_phase("connections")
+        if self.stats is not None:
+            self.stats["areas"][area].update({"rooms_requested": total_size, "rooms_grown": rooms_grown, 
+                                              "connections_requested": connection_count, 
+                                              "connections_made": connections_made})
+
+    def __finish_map(self, random: Random):
+        self.__place_corridor_decorations(random)
+        # Only accessible rooms get decorations or enemies, in map order
+        for index in merge(*self.area_rooms):
+            self.__roll_random_decoration(random, index)
+            self.__roll_enemy(random, index)
+        mapsize: int = self.byte_count
+        #print("Map Size: " + str(mapsize))
+        if mapsize > MAP_DATA_MAX_BYTES:
+            raise TGLMapSizeError(f"TGL Map Randomizer: Map size in Bytes ({mapsize}) is too large to fit in ROM.")
+
+    def __shuffle_areas(self, flip: bool, rotate: int, shuffled_areas: List[int]) -> Dict[int, List[Tuple[int, int]]]:
         # Optionally flip and rotate vanilla map layout, then shuffle area numbers
-        division: List[List[int]] = deepcopy(area_template)
-        
-        if flip:
-            # Flip the map across Y-axis (mirrored)
-            for ycoord in division:
-                ycoord.reverse()
-        rotation = 0
-        while rotation < rotate:
-            # Rotate map counter-clockwise up to 3 times
-            # https://stackoverflow.com/questions/8421337/rotating-a-two-dimensional-array-in-python
-            division = list(reversed(list(zip(*division))))
-            rotation += 1
-        ykey = 0
-        for ycoord in self.mapdata:
-            xkey = 0
-            for xcoord in ycoord:
-                # For all areas except 0 (and -1), set the areanum to a shuffled number
-                if division[ykey][xkey] > 0:
-                    xcoord.area = shuffled_areas[division[ykey][xkey] - 1]
-                else:
-                    xcoord.area = division[ykey][xkey]
-                xkey += 1
-            ykey += 1
-
-    def __find_starting_points(self, world: "TGLWorld"):
-        possible_entrances = {
-            1: [],
-            2: [],
-            3: [],
-            4: [],
-            5: [],
-            6: [],
-            7: [],
-            8: [],
-            9: [],
-            10:[]
-        }
-        ykey = 0
-        for ycoord in self.mapdata:
-            xkey = 0
-            for xcoord in ycoord:
-                if xcoord.area == -1:
-                    up_block = None
-                    down_block = None
-                    left_block = None
-                    right_block = None
-                    if ykey > 0:
-                        up_block = self.mapdata[ykey-1][xkey]
-                    if ykey < 23:
-                        down_block = self.mapdata[ykey+1][xkey]
-                    if xkey > 0:
-                        left_block = self.mapdata[ykey][xkey-1]
-                    if xkey < 23:
-                        right_block = self.mapdata[ykey][xkey+1]
-
-                    # Check each neighboring block to a border. If it connects Area 0 to a different Area, 
-                    # add it to the possible entry points for the Area 
-                    if up_block is not None:
-                        if up_block.area == 0:
-                            if down_block is not None:
-                                if down_block.area > 0:
-                                    possible_entrances[down_block.area].append((ykey,xkey,TGLRoomExits.UP))
-                    if down_block is not None:
-                        if down_block.area == 0:
-                            if up_block is not None:
-                                if up_block.area > 0:
-                                    possible_entrances[up_block.area].append((ykey,xkey,TGLRoomExits.DOWN))
-                    if left_block is not None:
-                        if left_block.area == 0:
-                            if right_block is not None:
-                                if right_block.area > 0:
-                                    possible_entrances[right_block.area].append((ykey,xkey,TGLRoomExits.LEFT))
-                    if right_block is not None:
-                        if right_block.area == 0:
-                            if left_block is not None:
-                                if left_block.area > 0:
-                                    possible_entrances[left_block.area].append((ykey,xkey,TGLRoomExits.RIGHT))
-                xkey += 1
-            ykey += 1                    
-
-        for areanum in possible_entrances:
+        # Returns the possible entrances for each shuffled area
+        # Nothing is accessible yet, so the area column can be written directly without touching the room index
+        template = template_variants[(flip, rotate)]
+        area_numbers = [0] + shuffled_areas
+        for index in range(MAP_SIZE):
+            # For all areas except 0 (and -1), set the areanum to a shuffled number
+            template_area = template[index]
+            self.area[index] = area_numbers[template_area] if template_area >= 0 else template_area
+        entrances = template_entrances[(flip, rotate)]
+        return {shuffled_areas[template_area - 1]: entrances[template_area] for template_area in range(1, 11)}
+
+    def __find_starting_points(self, random: Random, possible_entrances: Dict[int, List[Tuple[int, int]]]):
+        exits = self.exits
+        for areanum in range(1, 11):
             if not possible_entrances[areanum]:
                 # This is an error, we generated a map with no possible entry points to an area
-                raise Exception(f"TGL Map Rando: No valid entrance point for Area {areanum}.")
+                raise TGLMapEntranceError(f"TGL Map Rando: No valid entrance point for Area {areanum}.")
             else:
-                entrance: Tuple = world.random.choice(possible_entrances[areanum])
-                thisroom: TGLRoom = self.mapdata[entrance[0]][entrance[1]]
+                index, direction = random.choice(possible_entrances[areanum])
 
-                thisroom.area = 0
-                thisroom.is_startingpoint = True
-                thisroom.is_accessible = True
-                ykey: int = entrance[0]
-                xkey: int = entrance[1]
+                self.set_area(index, 0)
+                self.set_flags(index, ROOM_STARTINGPOINT | ROOM_ACCESSIBLE)
 
                 # Set the neighboring rooms correctly to act as area connectors
-                if entrance[2] == TGLRoomExits.DOWN:
-                    thisroom.exits |= TGLRoomExits.DOWN
-                    thisroom.exits |= TGLRoomExits.UP
-                    self.mapdata[ykey-1][xkey].exits |= TGLRoomExits.DOWN
-                    self.mapdata[ykey-1][xkey].is_startingpoint = True
-                    self.mapdata[ykey-1][xkey].is_accessible = True
-                    self.mapdata[ykey+1][xkey].exits |= TGLRoomExits.UP
-                    self.mapdata[ykey+1][xkey].is_accessible = True
-                if entrance[2] == TGLRoomExits.UP:
-                    thisroom.exits |= TGLRoomExits.DOWN
-                    thisroom.exits |= TGLRoomExits.UP
-                    self.mapdata[ykey+1][xkey].exits |= TGLRoomExits.UP
-                    self.mapdata[ykey+1][xkey].is_startingpoint = True
-                    self.mapdata[ykey+1][xkey].is_accessible = True
-                    self.mapdata[ykey-1][xkey].exits |= TGLRoomExits.DOWN
-                    self.mapdata[ykey-1][xkey].is_accessible = True
-                if entrance[2] == TGLRoomExits.RIGHT:
-                    thisroom.exits |= TGLRoomExits.RIGHT
-                    thisroom.exits |= TGLRoomExits.LEFT
-                    self.mapdata[ykey][xkey-1].exits |= TGLRoomExits.RIGHT
-                    self.mapdata[ykey][xkey-1].is_startingpoint = True
-                    self.mapdata[ykey][xkey-1].is_accessible = True
-                    self.mapdata[ykey][xkey+1].exits |= TGLRoomExits.LEFT
-                    self.mapdata[ykey][xkey+1].is_accessible = True
-                if entrance[2] == TGLRoomExits.LEFT:
-                    thisroom.exits |= TGLRoomExits.RIGHT
-                    thisroom.exits |= TGLRoomExits.LEFT
-                    self.mapdata[ykey][xkey+1].exits |= TGLRoomExits.LEFT
-                    self.mapdata[ykey][xkey+1].is_startingpoint = True
-                    self.mapdata[ykey][xkey+1].is_accessible = True
-                    self.mapdata[ykey][xkey-1].exits |= TGLRoomExits.RIGHT
-                    self.mapdata[ykey][xkey-1].is_accessible = True
-
-
-    def __grow_area(self, world: "TGLWorld", area: int, total_size: int):
-        grow_points = []
-        ykey = 0
+                # The entrance exits toward Area 0, the room on the other side becomes the Area's starting point
+                opposite = EXIT_OPPOSITES[direction]
+                area_zero_room = neighbor_table[index][EXIT_COLUMN[direction]]
+                starting_room = neighbor_table[index][EXIT_COLUMN[opposite]]
+                exits[index] |= direction | opposite
+                exits[starting_room] |= direction
+                self.set_flags(starting_room, ROOM_STARTINGPOINT | ROOM_ACCESSIBLE)
+                exits[area_zero_room] |= opposite
+                self.set_flags(area_zero_room, ROOM_ACCESSIBLE)
+
+
+    def __grow_area(self, random: Random, area: int, total_size: int) -> int:
+        # Grow the area one room at a time from its accessible rooms, picking a random room that can still grow, 
+        #  then a random direction it can grow in.
+        # The frontier only holds rooms with at least one valid growth step, so every draw grows the area.
+        # Rooms are removed by swapping in the last entry, and only the neighbors of a new room can lose a step.
+        frontier: List[int] = []
+        position: Dict[int, int] = {}
+        for index in self.area_rooms[area]:
+            if self.__growth_steps(index, area):
+                position[index] = len(frontier)
+                frontier.append(index)
         size_grown = 0
-        for ycoord in self.mapdata:
-            xkey = 0
-            for xcoord in ycoord:
-                if (xcoord.area == area) and (xcoord.is_accessible == True):
-                    new_point = (ykey,xkey)
-                    grow_points.append(new_point)
-                xkey += 1
-            ykey += 1
-        while (total_size > size_grown) and (len(grow_points) > 0):
-            # Choose a random existing room, attempt to grow
-            # Choose a random order of directions to grow and attempt in sequence
-            # Stop when a grow point is reached
-            # If growth fails, remove the point from the list
-            choose_point = world.random.choice(grow_points)
-            ykey: int = choose_point[0]
-            xkey: int = choose_point[1]
-            sequence = world.random.sample(range(4), 4)
-            grow_success = False
-            for i in sequence:
-                if not grow_success:
-                    direction = 1 << i
-                    if (direction == TGLRoomExits.UP) and (ykey > 0):
-                        nextroom = self.mapdata[ykey - 1][xkey]
-                        if (nextroom.area == area) and (nextroom.is_accessible == False):
-                            self.mapdata[ykey][xkey].exits |= TGLRoomExits.UP
-                            nextroom.exits |= TGLRoomExits.DOWN
-                            nextroom.is_accessible = True
-                            new_point = (ykey - 1, xkey)
-                            grow_points.append(new_point)
-                            grow_success = True
-                    if (direction == TGLRoomExits.LEFT) and (xkey > 0):
-                        nextroom = self.mapdata[ykey][xkey - 1]
-                        if (nextroom.area == area) and (nextroom.is_accessible == False):
-                            self.mapdata[ykey][xkey].exits |= TGLRoomExits.LEFT
-                            nextroom.exits |= TGLRoomExits.RIGHT
-                            nextroom.is_accessible = True
-                            new_point = (ykey, xkey - 1)
-                            grow_points.append(new_point)
-                            grow_success = True
-                    if (direction == TGLRoomExits.RIGHT) and (xkey < 23):
-                        nextroom = self.mapdata[ykey][xkey + 1]
-                        if (nextroom.area == area) and (nextroom.is_accessible == False):
-                            self.mapdata[ykey][xkey].exits |= TGLRoomExits.RIGHT
-                            nextroom.exits |= TGLRoomExits.LEFT
-                            nextroom.is_accessible = True
-                            new_point = (ykey, xkey + 1)
-                            grow_points.append(new_point)
-                            grow_success = True
-                    if (direction == TGLRoomExits.DOWN) and (ykey < 23):
-                        nextroom = self.mapdata[ykey + 1][xkey]
-                        if (nextroom.area == area) and (nextroom.is_accessible == False):
-                            self.mapdata[ykey][xkey].exits |= TGLRoomExits.DOWN
-                            nextroom.exits |= TGLRoomExits.UP
-                            nextroom.is_accessible = True
-                            new_point = (ykey + 1, xkey)
-                            grow_points.append(new_point)
-                            grow_success = True
-            if grow_success:
+        exits = self.exits
+        while (total_size > size_grown) and frontier:
+            choose_point = frontier[random.randrange(len(frontier))]
+            direction, nextroom, opposite = random.choice(self.__growth_steps(choose_point, area))
+            exits[choose_point] |= direction
+            exits[nextroom] |= opposite
+            self.set_flags(nextroom, ROOM_ACCESSIBLE)
+            size_grown += 1
+            # The new room is no longer a valid step for its neighbors
+            for _, neighbor, _ in room_neighbors[nextroom]:
+                if (neighbor in position) and not self.__growth_steps(neighbor, area):
+                    last = frontier.pop()
+                    removed = position.pop(neighbor)
+                    if last != neighbor:
+                        frontier[removed] = last
+                        position[last] = removed
+            if self.__growth_steps(nextroom, area):
+                position[nextroom] = len(frontier)
+                frontier.append(nextroom)
+        return size_grown
+
+    def __grow_spanning_tree(self, random: Random, area: int, total_size: int) -> int:
+        # Wilson-style loop-erased random walks from random rooms until they hit the area's accessible rooms, 
+        #  so the layout is a tree with no rejected steps.
+        # Each walk joins the tree from the end nearest to it, and the last one is cut short once the area is full,
+        #  so the area only covers some of the rooms the walks could reach.
+        areas = self.area
+        flags = self.flags
+        exits = self.exits
+        in_tree = set(self.area_rooms[area])
+        # Walks can only use rooms the tree can actually reach
+        walk_steps: Dict[int, List[Tuple[int, int, int]]] = {}
+        reached = set(in_tree)
+        pending = list(in_tree)
+        while pending:
+            index = pending.pop()
+            walk_steps[index] = [step for step in room_neighbors[index] 
+                                 if (areas[step[1]] == area) and not (flags[step[1]] & ROOM_ACCESSIBLE)]
+            for _, neighbor, _ in walk_steps[index]:
+                if neighbor not in reached:
+                    reached.add(neighbor)
+                    pending.append(neighbor)
+        for index in in_tree:
+            # Walks end when they reach the tree, so tree rooms can be stepped onto from any neighbor
+            for direction, neighbor, opposite in walk_steps[index]:
+                walk_steps[neighbor].append((opposite, index, direction))
+        walk_starts = sorted(index for index in walk_steps if index not in in_tree)
+        random.shuffle(walk_starts)
+
+        size_grown = 0
+        next_step: Dict[int, Tuple[int, int, int]] = {}
+        for start in walk_starts:
+            if size_grown >= total_size:
+                break
+            index = start
+            while index not in in_tree:
+                next_step[index] = random.choice(walk_steps[index])
+                index = next_step[index][1]
+            path: List[int] = []
+            index = start
+            while index not in in_tree:
+                path.append(index)
+                index = next_step[index][1]
+            for index in reversed(path[-(total_size - size_grown):]):
+                direction, nextroom, opposite = next_step[index]
+                exits[index] |= direction
+                exits[nextroom] |= opposite
+                self.set_flags(index, ROOM_ACCESSIBLE)
+                in_tree.add(index)
                 size_grown += 1
-            else:
-                grow_points.remove(choose_point)
+        return size_grown
+
+    def __growth_steps(self, index: int, area: int) -> List[Tuple[int, int, int]]:
+        # Neighbors in the same area that are not part of the area yet
+        areas = self.area
+        flags = self.flags
+        return [step for step in room_neighbors[index] 
+                if (areas[step[1]] == area) and not (flags[step[1]] & ROOM_ACCESSIBLE)]
 
 
     def __grow_area_zero(self):
         # Form outside ring
-        ykey = 0
-        for ycoord in self.mapdata:
-            xkey = 0
-            for xcoord in ycoord:
-                if xcoord.area == 0:
-                    # See if next to a wall
-                    if (self.mapdata[ykey - 1][xkey].area < 0) or (self.mapdata[ykey + 1][xkey].area < 0):
-                        self.mapdata[ykey][xkey].is_accessible = True
-                        self.mapdata[ykey][xkey].avoid_special = True
-                        if self.mapdata[ykey][xkey - 1].area == 0:
-                            # Grow left
-                            self.mapdata[ykey][xkey].exits |= TGLRoomExits.LEFT
-                            self.mapdata[ykey][xkey - 1].is_accessible = True
-                            self.mapdata[ykey][xkey - 1].avoid_special = True
-                            self.mapdata[ykey][xkey - 1].exits |= TGLRoomExits.RIGHT
-                        if self.mapdata[ykey][xkey + 1].area == 0:
-                            # Grow right
-                            self.mapdata[ykey][xkey].exits |= TGLRoomExits.RIGHT
-                            self.mapdata[ykey][xkey + 1].is_accessible = True
-                            self.mapdata[ykey][xkey + 1].avoid_special = True
-                            self.mapdata[ykey][xkey + 1].exits |= TGLRoomExits.LEFT
-                    if (self.mapdata[ykey][xkey - 1].area < 0) or (self.mapdata[ykey][xkey + 1].area < 0):
-                        self.mapdata[ykey][xkey].is_accessible = True
-                        self.mapdata[ykey][xkey].avoid_special = True
-                        if self.mapdata[ykey - 1][xkey].area == 0:
-                            # Grow up
-                            self.mapdata[ykey][xkey].exits |= TGLRoomExits.UP
-                            self.mapdata[ykey - 1][xkey].is_accessible = True
-                            self.mapdata[ykey - 1][xkey].avoid_special = True
-                            self.mapdata[ykey - 1][xkey].exits |= TGLRoomExits.DOWN
-                        if self.mapdata[ykey + 1][xkey].area == 0:
-                            # Grow down
-                            self.mapdata[ykey][xkey].exits |= TGLRoomExits.DOWN
-                            self.mapdata[ykey + 1][xkey].is_accessible = True
-                            self.mapdata[ykey + 1][xkey].avoid_special = True
-                            self.mapdata[ykey + 1][xkey].exits |= TGLRoomExits.UP
-                xkey += 1
-            ykey += 1
+        # Rooms past the edge of the map count as walls, like the -1 border rooms
+        area = self.area
+        exits = self.exits
+        ring = ROOM_ACCESSIBLE | ROOM_AVOID_SPECIAL
+        for index in range(MAP_SIZE):
+            if area[index] == 0:
+                down, right, left, up = neighbor_table[index]
+                down_area, right_area, left_area, up_area = (area[neighbor] if neighbor >= 0 else -1 
+                                                             for neighbor in (down, right, left, up))
+                # See if next to a wall
+                if (up_area < 0) or (down_area < 0):
+                    self.set_flags(index, ring)
+                    if left_area == 0:
+                        # Grow left
+                        exits[index] |= EXIT_LEFT
+                        self.set_flags(left, ring)
+                        exits[left] |= EXIT_RIGHT
+                    if right_area == 0:
+                        # Grow right
+                        exits[index] |= EXIT_RIGHT
+                        self.set_flags(right, ring)
+                        exits[right] |= EXIT_LEFT
+                if (left_area < 0) or (right_area < 0):
+                    self.set_flags(index, ring)
+                    if up_area == 0:
+                        # Grow up
+                        exits[index] |= EXIT_UP
+                        self.set_flags(up, ring)
+                        exits[up] |= EXIT_DOWN
+                    if down_area == 0:
+                        # Grow down
+                        exits[index] |= EXIT_DOWN
+                        self.set_flags(down, ring)
+                        exits[down] |= EXIT_UP
 
     # Place items and minibosses which hold items
     # Unlike the standalone rando, we have to keep these in their original area for AP location rules
-    def __place_item_locations(self, world: "TGLWorld", area: int):
+    def __place_item_locations(self, random: Random, area: int):
         locations = self.__create_suitable_list(area, False, False)
 
         # We need lists of items to place per area, 2 minibosses per area, and blocksets
@@ -773,147 +1258,134 @@ class TGLMap:
         miniboss_list = [0x0B + (area * 2), 0x0C + (area * 2)]
         item_blocks = [0xAE94,0xC994,0xBE94,0xB394]
 
+        item_rooms: List[int] = []
         for item in item_list:
             if len(locations) > 0:
-                item_room = world.random.choice(locations)
-                item_room.room_type = TGLRoomType.ITEM
-                item_room.content_id = item
-                item_room.block_set = world.random.choice(item_blocks)
-                locations.remove(item_room)
+                item_room = self.__take_random(random, locations, area)
+                self.__set_room(item_room, TGLRoomType.ITEM, item)
+                self.set_block_set(item_room, random.choice(item_blocks))
+                item_rooms.append(item_room)
             else:
-                raise Exception("TGL Map Rando: Not enough suitable locations for placing items.") 
+                raise TGLMapPlacementError("TGL Map Rando: Not enough suitable locations for placing items.", area)
         
+        miniboss_rooms: List[int] = []
         for miniboss in miniboss_list:
             if len(locations) > 0:
-                item_room = world.random.choice(locations)
-                item_room.room_type = TGLRoomType.MINIBOSS
-                item_room.content_id = miniboss
-                locations.remove(item_room)
+                item_room = self.__take_random(random, locations, area)
+                self.__set_room(item_room, TGLRoomType.MINIBOSS, miniboss)
+                miniboss_rooms.append(item_room)
             else:
-                raise Exception("TGL Map Rando: Not enough suitable locations for placing minibosses.")
+                raise TGLMapPlacementError("TGL Map Rando: Not enough suitable locations for placing minibosses.", 
+                                           area)
+
+        self.__record_area_items(area, item_rooms, miniboss_rooms)
+
+    def __record_area_items(self, area: int, item_rooms: List[int], miniboss_rooms: List[int]):
+        # Generic IDs are numbered in map order within the area
+        # Generic ground loc IDs are (generic offset + area*10 + index+3)
+        for offset, item_room in enumerate(sorted(item_rooms)):
+            self.__add_location(TGL_LOCID_GROUND_GENERIC + (area * 10) + offset + 3, 
+                                TGL_LOCID_GROUND + self.content_id[item_room], item_room)
+        # Generic miniboss loc IDs are (generic offset + area*10 + index)
+        for offset, item_room in enumerate(sorted(miniboss_rooms)):
+            self.__add_location(TGL_LOCID_GROUND_GENERIC + (area * 10) + offset, 
+                                TGL_LOCID_GROUND + self.content_id[item_room], item_room)
 
     def __place_starting_text_room(self):
-        coord = [12, 11]
-        starting_room: TGLRoom = self.mapdata[coord[0]][coord[1]]
-        starting_room.room_type = TGLRoomType.TEXT
-        starting_room.content_id = 0x0
-        starting_room.exits = 0b1111
+        index = 12 * MAP_WIDTH + 11
+        self.__set_room(index, TGLRoomType.TEXT, 0x0)
+        self.exits[index] = 0b1111
         # Set neighboring rooms to accessible and with exits
-        self.mapdata[coord[0] + 1][coord[1]].is_accessible = True
-        self.mapdata[coord[0] + 1][coord[1]].exits |= TGLRoomExits.UP
-        self.mapdata[coord[0] - 1][coord[1]].is_accessible = True
-        self.mapdata[coord[0] - 1][coord[1]].exits |= TGLRoomExits.DOWN
-        self.mapdata[coord[0]][coord[1] + 1].is_accessible = True
-        self.mapdata[coord[0]][coord[1] + 1].exits |= TGLRoomExits.LEFT
-        self.mapdata[coord[0]][coord[1] - 1].is_accessible = True
-        self.mapdata[coord[0]][coord[1] - 1].exits |= TGLRoomExits.RIGHT
+        for direction, neighbor in zip(EXIT_DIRECTIONS, neighbor_table[index]):
+            self.set_flags(neighbor, ROOM_ACCESSIBLE)
+            self.exits[neighbor] |= EXIT_OPPOSITES[direction]
+
+    def __set_room(self, index: int, room_type: TGLRoomType, content_id: int):
+        self.set_room_type(index, room_type)
+        self.content_id[index] = content_id
+
+    def __place_location_room(self, random: Random, rooms: List[int], area: int, room_type: TGLRoomType, 
+                              content_id: int):
+        index = self.__take_random(random, rooms, area)
+        self.__set_room(index, room_type, content_id)
+        self.__record_location(index)
+
+    def __record_location(self, index: int):
+        # Shops and Corridors hold items at locations known from the content_id alone
+        room_type = self.room_type[index]
+        content_id = self.content_id[index]
+        if (room_type == TGLRoomType.SINGLESHOP) or (room_type == TGLRoomType.MULTISHOP):
+            shop_location = shop_location_offsets[content_id]
+            self.__add_location(TGL_LOCID_SHOP_GENERIC + shop_location, TGL_LOCID_SHOP + shop_location, index)
+        # Corridor 21 is a room, but has no item, so don't log it as a location
+        elif (room_type == TGLRoomType.CORRIDOR) and (content_id < 21):
+            self.__add_location(TGL_LOCID_CORRIDOR_GENERIC + content_id, TGL_LOCID_CORRIDOR + content_id, index)
+            self.__add_location(TGL_LOCID_BONUS_GENERIC + content_id, TGL_LOCID_BONUS + content_id, index)
+
+    @staticmethod
+    def __take_random(random: Random, rooms: List[int], area: int) -> int:
+        # Same draw as random.choice, but removes the room by position instead of searching the list for it
+        if not rooms:
+            raise TGLMapPlacementError(f"TGL Map Rando: Not enough suitable rooms available for Area {area}.", area)
+        return rooms.pop(random.randrange(len(rooms)))
 
     # Corridors, shops
-    def __place_important_rooms(self, world: "TGLWorld", area: int):
+    def __place_important_rooms(self, random: Random, area: int):
         suitable_rooms = self.__create_suitable_list(area, True, True)
         if not suitable_rooms:
-            raise Exception(f"TGL Map Rando: Not enough suitable rooms available for Area {area}.")
+            raise TGLMapPlacementError(f"TGL Map Rando: Not enough suitable rooms available for Area {area}.", area)
         # Corridors
         if area == 0:
-            c_room = world.random.choice(suitable_rooms)
-            c_room.room_type = TGLRoomType.CORRIDOR
-            c_room.content_id = 21
-            suitable_rooms.remove(c_room)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.CORRIDOR, 21)
             # Single Shops - for now putting in same areas as vanilla
             for shopnum in range(0x3A, 0x3F):
-                shoproom = world.random.choice(suitable_rooms)
-                shoproom.room_type = TGLRoomType.SINGLESHOP
-                shoproom.content_id = shopnum
-                suitable_rooms.remove(shoproom)
+                self.__place_location_room(random, suitable_rooms, area, TGLRoomType.SINGLESHOP, shopnum)
         elif area == 1:
-            c_room = world.random.choice(suitable_rooms)
-            c_room.room_type = TGLRoomType.CORRIDOR
-            c_room.content_id = 11
-            suitable_rooms.remove(c_room)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.CORRIDOR, 11)
         else:
-            c_room = world.random.choice(suitable_rooms)
-            c_room.room_type = TGLRoomType.CORRIDOR
-            c_room.content_id = area
-            suitable_rooms.remove(c_room)
-            c_room = world.random.choice(suitable_rooms)
-            c_room.room_type = TGLRoomType.CORRIDOR
-            c_room.content_id = area + 10
-            suitable_rooms.remove(c_room)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.CORRIDOR, area)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.CORRIDOR, area + 10)
         
         
         # "Multi" shops - for now placing in vanilla zones
         if area == 2:
-            shopnum = 0x3F
-            shoproom = world.random.choice(suitable_rooms)
-            shoproom.room_type = TGLRoomType.MULTISHOP
-            shoproom.content_id = shopnum
-            suitable_rooms.remove(shoproom)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.MULTISHOP, 0x3F)
         if area == 4:
-            shopnum = 0x41
-            shoproom = world.random.choice(suitable_rooms)
-            shoproom.room_type = TGLRoomType.MULTISHOP
-            shoproom.content_id = shopnum
-            suitable_rooms.remove(shoproom)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.MULTISHOP, 0x41)
         if area == 10:
-            shopnum = 0x43
-            shoproom = world.random.choice(suitable_rooms)
-            shoproom.room_type = TGLRoomType.MULTISHOP
-            shoproom.content_id = shopnum
-            suitable_rooms.remove(shoproom)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.MULTISHOP, 0x43)
         if area == 7:
             # There are 2 shops in Area 7
-            shopnum = 0x40
-            shoproom = world.random.choice(suitable_rooms)
-            shoproom.room_type = TGLRoomType.MULTISHOP
-            shoproom.content_id = shopnum
-            suitable_rooms.remove(shoproom)
-            shopnum = 0x42
-            shoproom = world.random.choice(suitable_rooms)
-            shoproom.room_type = TGLRoomType.MULTISHOP
-            shoproom.content_id = shopnum
-            suitable_rooms.remove(shoproom)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.MULTISHOP, 0x40)
+            self.__place_location_room(random, suitable_rooms, area, TGLRoomType.MULTISHOP, 0x42)
 
     # Saves, text, power chip refill
-    def __place_safe_rooms(self, world: "TGLWorld", area: int):
+    def __place_safe_rooms(self, random: Random, area: int):
         suitable_rooms = self.__create_suitable_list(area, True, True)
         
         if area == 0:
             # "Power Chip" refill room - Area 0
-            chiproom = world.random.choice(suitable_rooms)
-            chiproom.block_set = 0xEA95
-            chiproom.chip_tile = True
-            suitable_rooms.remove(chiproom)
+            chiproom = self.__take_random(random, suitable_rooms, area)
+            self.set_block_set(chiproom, 0xEA95)
+            self.flags[chiproom] |= ROOM_CHIP_TILE
             # Text rooms for Area 0, skip text 0 because we place that in the start room
             for textnum in range(1,4):
-                textroom = world.random.choice(suitable_rooms)
-                textroom.room_type = TGLRoomType.TEXT
-                textroom.content_id = textnum
-                suitable_rooms.remove(textroom)
+                self.__set_room(self.__take_random(random, suitable_rooms, area), TGLRoomType.TEXT, textnum)
         # Save room
-        saveroom = world.random.choice(suitable_rooms)
-        saveroom.room_type = TGLRoomType.SAVE
-        suitable_rooms.remove(saveroom)
+        self.set_room_type(self.__take_random(random, suitable_rooms, area), TGLRoomType.SAVE)
         # Text rooms non-Area 0
         # Unlike vanilla we're putting each hint room in the area it belongs to
         # Corridor 1 hint is in Area 0 as well, start at 2
         if area > 1:
-            textroom = world.random.choice(suitable_rooms)
-            textroom.room_type = TGLRoomType.TEXT
-            textroom.content_id = area + 10
+            self.__set_room(self.__take_random(random, suitable_rooms, area), TGLRoomType.TEXT, area + 10)
 
     # N E S W box rooms
     # NOTE: I hate this, and this code was buggy in original. This should be vastly simplified.
     def __place_cardinal_points(self):
         rooms_on_ring: List[Tuple] = []
-        ykey: int = 0
-        for ycoord in self.mapdata:
-            xkey: int = 0
-            for xcoord in ycoord:
-                if (xcoord.area == 0) and xcoord.avoid_special and (xcoord.room_type == 0) and xcoord.is_accessible:
-                    room_coord = (ykey, xkey)
-                    rooms_on_ring.append(room_coord)
-                xkey += 1
-            ykey += 1
+        for index in self.area_rooms[0]:
+            if (self.flags[index] & ROOM_AVOID_SPECIAL) and (self.room_type[index] == TGLRoomType.NORMAL):
+                rooms_on_ring.append(divmod(index, MAP_WIDTH))
         north_y = None
         south_y = None
         west_x = None
@@ -981,10 +1453,10 @@ class TGLMap:
                 if (east_distance is None) or (distance <= east_distance):
                     east_room = room
                     east_distance = distance
-        self.mapdata[north_room[0]][north_room[1]].block_set = 0xA695
-        self.mapdata[south_room[0]][south_room[1]].block_set = 0xB495
-        self.mapdata[west_room[0]][west_room[1]].block_set = 0xD995
-        self.mapdata[east_room[0]][east_room[1]].block_set = 0xC895
+        self.set_block_set(north_room[0] * MAP_WIDTH + north_room[1], 0xA695)
+        self.set_block_set(south_room[0] * MAP_WIDTH + south_room[1], 0xB495)
+        self.set_block_set(west_room[0] * MAP_WIDTH + west_room[1], 0xD995)
+        self.set_block_set(east_room[0] * MAP_WIDTH + east_room[1], 0xC895)
 
             
     '''
@@ -994,217 +1466,190 @@ class TGLMap:
     '''
 
     def __place_starting_points(self):
-        for ycoord in self.mapdata:
-            for xcoord in ycoord:
-                if xcoord.area > 0 and xcoord.is_startingpoint:
-                    if xcoord.area == 1:
-                        xcoord.room_type = TGLRoomType.CORRIDOR
-                        xcoord.content_id = 1
-                    else:
-                        xcoord.room_type = TGLRoomType.SAVE
+        for area in range(1, 11):
+            # Copy the list, changing the room type below updates the index
+            for index in list(self.area_starting_points[area]):
+                if area == 1:
+                    self.__set_room(index, TGLRoomType.CORRIDOR, 1)
+                    self.__record_location(index)
+                else:
+                    self.set_room_type(index, TGLRoomType.SAVE)
 
 
-    def __populate_enemies(self, world: "TGLWorld"):
-        for ycoord in self.mapdata:
-            for xcoord in ycoord:
-                if xcoord.is_accessible:
-                    if (xcoord.room_type == TGLRoomType.NORMAL) or (xcoord.room_type == TGLRoomType.ITEM):
-                        # Sets the % chance there is an enemy (currently ~90%)
-                        # Skip the PChip refill room in Area 0
-                        if not (xcoord.block_set == 0xEA95):
-                            if world.random.random() > 0.1:
-                                xcoord.enemy_type = (world.random.choice(range(47))) + 1
-
-    def __place_area_decorations(self, world: "TGLWorld"):
-        starting_rooms: List[Tuple] = []
-        ykey: int = 0
-        for ycoord in self.mapdata:
-            xkey: int = 0
-            for xcoord in ycoord:
-                if xcoord.is_startingpoint and (xcoord.area != 0):
-                    new_room = (ykey,xkey)
-                    starting_rooms.append(new_room)
-                xkey += 1
-            ykey += 1
-        for room in starting_rooms:
-            ykey = room[0]
-            xkey = room[1]
-            if (self.mapdata[ykey][xkey].exits & TGLRoomExits.UP):
-                room_up = self.mapdata[ykey - 1][xkey]
-                if (room_up.room_type == TGLRoomType.NORMAL) and (room_up.block_set == -1):
-                    if (world.random.random() < 0.5):
-                        room_up.block_set = world.random.choice(room_blocksets["no_chips_area_transition_down"])
-                        room_up.chip_tile = False
-                    else:
-                        room_up.block_set = world.random.choice(room_blocksets["with_chips_area_transition_down"])
-                        room_up.chip_tile = True
-            if (self.mapdata[ykey][xkey].exits & TGLRoomExits.DOWN):
-                room_down = self.mapdata[ykey + 1][xkey]
-                if (room_down.room_type == TGLRoomType.NORMAL) and (room_down.block_set == -1):
-                    if (world.random.random() < 0.5):
-                        room_down.block_set = world.random.choice(room_blocksets["no_chips_area_transition_up"])
-                        room_down.chip_tile = False
-                    else:
-                        room_down.block_set = world.random.choice(room_blocksets["with_chips_area_transition_up"])
-                        room_down.chip_tile = True
-            if (self.mapdata[ykey][xkey].exits & TGLRoomExits.LEFT):
-                room_left = self.mapdata[ykey][xkey - 1]
-                if (room_left.room_type == TGLRoomType.NORMAL) and (room_left.block_set == -1):
-                    if (world.random.random() < 0.5):
-                        room_left.block_set = world.random.choice(room_blocksets["no_chips_area_transition_right"])
-                        room_left.chip_tile = False
-                    else:
-                        room_left.block_set = world.random.choice(room_blocksets["with_chips_area_transition_right"])
-                        room_left.chip_tile = True
-            if (self.mapdata[ykey][xkey].exits & TGLRoomExits.RIGHT):
-                room_right = self.mapdata[ykey][xkey + 1]
-                if (room_right.room_type == TGLRoomType.NORMAL) and (room_right.block_set == -1):
-                    if (world.random.random() < 0.5):
-                        room_right.block_set = world.random.choice(room_blocksets["no_chips_area_transition_left"])
-                        room_right.chip_tile = False
-                    else:
-                        room_right.block_set = world.random.choice(room_blocksets["with_chips_area_transition_left"])
-                        room_right.chip_tile = True
+    def __roll_enemy(self, random: Random, index: int):
+        if (self.room_type[index] == TGLRoomType.NORMAL) or (self.room_type[index] == TGLRoomType.ITEM):
+            # Sets the % chance there is an enemy (currently ~90%)
+            # Skip the PChip refill room in Area 0
+            if not (self.block_set[index] == 0xEA95):
+                if random.random() > 0.1:
+                    # Enemies take an extra Byte, leave the room empty rather than overflow the map data
+                    if self.bytes_free() < 1:
+                        return
+                    self.set_enemy_type(index, (random.choice(range(47))) + 1)
 
+    def __decorate_transition(self, random: Random, index: int, no_chips: str, with_chips: str):
+        # Transition rooms get a block set facing the neighboring area, half of them with chips
+        if (self.room_type[index] == TGLRoomType.NORMAL) and (self.block_set[index] == -1):
+            if (random.random() < 0.5):
+                self.set_block_set(index, random.choice(room_blocksets[no_chips]))
+                self.flags[index] &= ~ROOM_CHIP_TILE
+            else:
+                self.set_block_set(index, random.choice(room_blocksets[with_chips]))
+                self.flags[index] |= ROOM_CHIP_TILE
 
-    def __place_corridor_decorations(self, world: "TGLWorld"):
-        corridor_rooms: List[Tuple] = []
-        ykey: int = 0
-        for ycoord in self.mapdata:
-            xkey: int = 0
-            for xcoord in ycoord:
-                if xcoord.is_startingpoint and (xcoord.area != 0):
-                    new_room = (ykey,xkey)
-                    corridor_rooms.append(new_room)
-                xkey += 1
-            ykey += 1
-        for room in corridor_rooms:
-            ykey = room[0]
-            xkey = room[1]
-            if (self.mapdata[ykey][xkey].exits & TGLRoomExits.UP):
-                room_up = self.mapdata[ykey - 1][xkey]
-                if (room_up.room_type == TGLRoomType.NORMAL) and (room_up.block_set == -1):
-                    room_up.block_set = world.random.choice(room_blocksets["corridor_transition_down"])
-                    room_up.chip_tile = False
-            if (self.mapdata[ykey][xkey].exits & TGLRoomExits.DOWN):
-                room_down = self.mapdata[ykey + 1][xkey]
-                if (room_down.room_type == TGLRoomType.NORMAL) and (room_down.block_set == -1):
-                    room_up.block_set = world.random.choice(room_blocksets["corridor_transition_up"])
-                    room_up.chip_tile = False
-            if (self.mapdata[ykey][xkey].exits & TGLRoomExits.LEFT):
-                room_left = self.mapdata[ykey][xkey - 1]
-                if (room_left.room_type == TGLRoomType.NORMAL) and (room_left.block_set == -1):
-                    room_up.block_set = world.random.choice(room_blocksets["corridor_transition_right"])
-                    room_up.chip_tile = False
-            if (self.mapdata[ykey][xkey].exits & TGLRoomExits.RIGHT):
-                room_right = self.mapdata[ykey][xkey + 1]
-                if (room_right.room_type == TGLRoomType.NORMAL) and (room_right.block_set == -1):
-                    room_up.block_set = world.random.choice(room_blocksets["corridor_transition_left"])
-                    room_up.chip_tile = False
-
-    def __place_random_decorations(self, world: "TGLWorld"):
+    def __place_area_decorations(self, random: Random):
+        for index in self.get_starting_points():
+            for direction, facing in ((EXIT_UP, "down"), (EXIT_DOWN, "up"), (EXIT_LEFT, "right"), (EXIT_RIGHT, "left")):
+                if (self.exits[index] & direction):
+                    self.__decorate_transition(random, neighbor_table[index][EXIT_COLUMN[direction]], 
+                                               "no_chips_area_transition_" + facing, 
+                                               "with_chips_area_transition_" + facing)
+
+
+    def __place_corridor_decorations(self, random: Random):
+        # NOTE: The down/left/right cases have always decorated room_up (the room above the starting point), 
+        #       which is kept as-is to match the original randomizer.
+        #       In practice every neighbor was already decorated by __place_area_decorations, so nothing changes here.
+        room_up = None
+        for index in self.get_starting_points():
+            if (self.exits[index] & EXIT_UP):
+                room_up = neighbor_table[index][EXIT_COLUMN[EXIT_UP]]
+                if (self.room_type[room_up] == TGLRoomType.NORMAL) and (self.block_set[room_up] == -1):
+                    self.set_block_set(room_up, random.choice(room_blocksets["corridor_transition_down"]))
+                    self.flags[room_up] &= ~ROOM_CHIP_TILE
+            for direction, blocks in ((EXIT_DOWN, "corridor_transition_up"),
+                                      (EXIT_LEFT, "corridor_transition_right"),
+                                      (EXIT_RIGHT, "corridor_transition_left")):
+                if (self.exits[index] & direction):
+                    neighbor = neighbor_table[index][EXIT_COLUMN[direction]]
+                    if (self.room_type[neighbor] == TGLRoomType.NORMAL) and (self.block_set[neighbor] == -1):
+                        self.set_block_set(room_up, random.choice(room_blocksets[blocks]))
+                        self.flags[room_up] &= ~ROOM_CHIP_TILE
+
+    def __roll_random_decoration(self, random: Random, index: int):
         decoration_chance = 5 # 1/x chance to have decorations
         chip_chance = 3 # 1/x chance to have chips if have decorations
-        for ycoord in self.mapdata:
-            for xcoord in ycoord:
-                if xcoord.is_accessible and (xcoord.room_type == TGLRoomType.NORMAL) and (xcoord.block_set == -1):
-                    if world.random.choice(range(decoration_chance)) == 0:
-                        if world.random.choice(range(chip_chance)) == 0:
-                            xcoord.block_set = world.random.choice(room_blocksets["with_chips_no_transition"])
-                            xcoord.chip_tile = True
-                        else:
-                            xcoord.block_set = world.random.choice(room_blocksets["no_chips_no_transition"])
-                            xcoord.chip_tile = False
+        if (self.room_type[index] == TGLRoomType.NORMAL) and (self.block_set[index] == -1):
+            if random.choice(range(decoration_chance)) == 0:
+                # Decorations are optional and take 2 extra Bytes, skip them if the map data would overflow
+                if self.bytes_free() < 2:
+                    return
+                if random.choice(range(chip_chance)) == 0:
+                    self.set_block_set(index, random.choice(room_blocksets["with_chips_no_transition"]))
+                    self.flags[index] |= ROOM_CHIP_TILE
+                else:
+                    self.set_block_set(index, random.choice(room_blocksets["no_chips_no_transition"]))
+                    self.flags[index] &= ~ROOM_CHIP_TILE
 
-    def __create_suitable_list(self, area: int, discard_special: bool, allow_overwrite: bool) -> List[TGLRoom]:
-        locations: List[TGLRoom] = []
-        for ycoord in self.mapdata:
-            for xcoord in ycoord:
-                if (xcoord.area == area) and xcoord.is_accessible and (xcoord.block_set == -1):
-                    if (xcoord.room_type == TGLRoomType.NORMAL) or \
-                        ((area != 0) and allow_overwrite and 
-                         (xcoord.room_type == TGLRoomType.SAVE) and xcoord.is_startingpoint):
-                        if not discard_special or not xcoord.avoid_special:
-                            if (area != 0) or not xcoord.is_startingpoint:
-                                locations.append(xcoord)
+    def __create_suitable_list(self, area: int, discard_special: bool, allow_overwrite: bool) -> List[int]:
+        # The index already holds the accessible, undecorated NORMAL rooms (plus Area starting point SAVE rooms)
+        locations: List[int] = []
+        for index in self.area_suitable[area]:
+            if allow_overwrite or (self.room_type[index] == TGLRoomType.NORMAL):
+                if not discard_special or not (self.flags[index] & ROOM_AVOID_SPECIAL):
+                    locations.append(index)
         #print("Area " + str(area) + " suitable: " + str(len(locations)))
         return locations
 
 
-    # Build a list of the rooms in an area, and test where connections can be made
-    def __add_connections(self, world: "TGLWorld", area: int, connection_count: int, oneway: bool, portal_only: bool):
-        rooms_in_area: List[Tuple] = []
+    # Build a list of every connection that can still be made in an area, and pick from it without replacement
+    def __add_connections(self, random: Random, area: int, connection_count: int, oneway: bool, 
+                          portal_only: bool) -> int:
+        if connection_count <= 0:
+            return 0
+        areas = self.area
+        exits = self.exits
+        flags = self.flags
+        room_types = self.room_type
+        portal_rooms = range(1, 6)  # Save, Corridor, Text and Shop rooms
+        candidates: List[Tuple[int, int, int, int]] = []
+        for room in self.area_rooms[area]:
+            for direction, neighbor, opposite in room_neighbors[room]:
+                if ((areas[neighbor] == area) and (flags[neighbor] & ROOM_ACCESSIBLE) 
+                        and not (exits[room] & direction)):
+                    if portal_only and not ((room_types[room] in portal_rooms) 
+                                            or (room_types[neighbor] in portal_rooms)):
+                        continue
+                    candidates.append((room, direction, neighbor, opposite))
+        position: Dict[Tuple[int, int], int] = {(room, direction): i 
+                                                for i, (room, direction, _, _) in enumerate(candidates)}
+
+        def take(i: int) -> Tuple[int, int, int, int]:
+            # Swap the last candidate into the hole, so every pick stays O(1)
+            taken = candidates[i]
+            last = candidates.pop()
+            del position[(taken[0], taken[1])]
+            if i < len(candidates):
+                candidates[i] = last
+                position[(last[0], last[1])] = i
+            return taken
+
         connections_made: int = 0
-        ykey = 0
-        for ycoord in self.mapdata:
-            xkey = 0
-            for xcoord in ycoord:
-                if (xcoord.area == area) and (xcoord.is_accessible):
-                    new_room = (ykey,xkey)
-                    rooms_in_area.append(new_room)
-                xkey += 1
-            ykey += 1
-        while (connections_made < connection_count) and (len(rooms_in_area) > 1):
-            room_loc = world.random.choice(rooms_in_area)
-            ykey: int = room_loc[0]
-            xkey: int = room_loc[1]
-            room: TGLRoom = self.mapdata[ykey][xkey]
-            direction_shift = world.random.choice(range(4))
-            direction = (1 << direction_shift) # choose one random direction to connect to
-            go_up: bool = ((ykey > 0) 
-                           and (self.mapdata[ykey - 1][xkey].area == area) 
-                           and (self.mapdata[ykey - 1][xkey].is_accessible) 
-                           and (room.exits & TGLRoomExits.UP == 0))
-            go_down: bool = ((ykey < 23) 
-                             and (self.mapdata[ykey + 1][xkey].area == area) 
-                             and (self.mapdata[ykey + 1][xkey].is_accessible) 
-                             and (room.exits & TGLRoomExits.DOWN == 0))
-            go_left: bool = ((xkey > 0) 
-                             and (self.mapdata[ykey][xkey - 1].area == area) 
-                             and (self.mapdata[ykey][xkey - 1].is_accessible) 
-                             and (room.exits & TGLRoomExits.LEFT == 0))
-            go_right: bool = ((xkey < 23) 
-                              and (self.mapdata[ykey][xkey + 1].area == area) 
-                              and (self.mapdata[ykey][xkey + 1].is_accessible) 
-                              and (room.exits & TGLRoomExits.RIGHT == 0))
-            if portal_only:
-                room_type = room.room_type
-                good_rooms = list(range(1,6))
-                if go_up:
-                    other_room_type = self.mapdata[ykey - 1][xkey].room_type
-                    go_up = (room_type in good_rooms) or (other_room_type in good_rooms)
-                if go_down:
-                    other_room_type = self.mapdata[ykey + 1][xkey].room_type
-                    go_down = (room_type in good_rooms) or (other_room_type in good_rooms)
-                if go_left:
-                    other_room_type = self.mapdata[ykey][xkey - 1].room_type
-                    go_left = (room_type in good_rooms) or (other_room_type in good_rooms)
-                if go_right:
-                    other_room_type = self.mapdata[ykey][xkey + 1].room_type
-                    go_right = (room_type in good_rooms) or (other_room_type in good_rooms)
-            if not (go_up or go_down or go_right or go_left):
-                rooms_in_area.remove(room_loc)
-            if (direction == TGLRoomExits.UP) and go_up:
-                room.exits |= TGLRoomExits.UP
-                if not oneway:
-                    self.mapdata[ykey - 1][xkey].exits |= TGLRoomExits.DOWN
-                connections_made += 1
-            if (direction == TGLRoomExits.DOWN) and go_down:
-                room.exits |= TGLRoomExits.DOWN
-                if not oneway:
-                    self.mapdata[ykey + 1][xkey].exits |= TGLRoomExits.UP
-                connections_made += 1
-            if (direction == TGLRoomExits.LEFT) and go_left:
-                room.exits |= TGLRoomExits.LEFT
-                if not oneway:
-                    self.mapdata[ykey][xkey - 1].exits |= TGLRoomExits.RIGHT
-                connections_made += 1
-            if (direction == TGLRoomExits.RIGHT) and go_right:
-                room.exits |= TGLRoomExits.RIGHT
-                if not oneway:
-                    self.mapdata[ykey][xkey + 1].exits |= TGLRoomExits.LEFT
-                connections_made += 1
-            
-                
+        while (connections_made < connection_count) and candidates:
+            room, direction, neighbor, opposite = take(random.randrange(len(candidates)))
+            exits[room] |= direction
+            if oneway:
+                self.one_way_exits.append((room, direction))
+            else:
+                exits[neighbor] |= opposite
+                # The same connection from the other side is no longer available
+                reverse = position.get((neighbor, opposite))
+                if reverse is not None:
+                    take(reverse)
+            connections_made += 1
+        if connections_made < connection_count:
+            logging.debug(f"TGL Map Rando: Area {area} only had room for {connections_made} of "
+                          f"{connection_count} connections.")
+        return connections_made
+
+
+def generate_random_map(random: Random, layout: int = MAP_LAYOUT_GROWTH, max_attempts: int = MAP_MAX_ATTEMPTS, 
+                        instrument: bool = False) -> TGLMap:
+    """Randomizes a map, rolling a whole new one from a fresh sub-seed whenever an attempt fails.
+    The first attempt draws from the given random directly, so maps that never fail stay the same for a seed."""
+    attempt_random = random
+    failed_attempts: List[str] = []
+    for attempt in range(1, max_attempts + 1):
+        tglmap = TGLMap(instrument)
+        try:
+            tglmap.randomize(attempt_random, layout)
+        except TGLMapError as error:
+            if attempt == max_attempts:
+                raise TGLMapError(f"TGL Map Rando: Failed to generate a map in {max_attempts} attempts.") from error
+            logging.debug(f"TGL Map Rando: Attempt {attempt} failed, retrying. ({error})")
+            failed_attempts.append(type(error).__name__)
+            attempt_random = Random(random.getrandbits(64))
+        else:
+            tglmap.attempts["map"] = attempt
+            if tglmap.stats is not None:
+                tglmap.stats["failed_attempts"] = failed_attempts
+            return tglmap
+
+
+# A generated map's snapshot, its attempts and its stats (if it was instrumented)
+TGLMapResult = Tuple[TGLMapSnapshot, Dict[str, int], Optional[Dict[str, Any]]]
+
+
+def generate_map_data(sub_seed: int, layout: int, instrument: bool = False) -> TGLMapResult:
+    """Randomizes the map for a sub-seed, keeping only its snapshot, how many attempts it took and its stats.
+    Also the worker for generate_random_maps, as the snapshot is far smaller to send back than the map."""
+    tglmap = generate_random_map(Random(sub_seed), layout, instrument=instrument)
+    return tglmap.snapshot(), tglmap.attempts, tglmap.stats
+
 
-        
\ No newline at end of file
+def generate_random_maps(jobs: List[Tuple[int, int]], instrument: bool = False,
+                         workers: int = 0) -> List[TGLMapResult]:
+    """Runs generate_map_data for each (sub-seed, layout) job, in up to workers worker processes if that's above 1.
+    A map only takes a few milliseconds, so worker processes rarely pay for their start-up unless there are a
+     great many maps and CPUs, which is why they are opt-in.
+    Each map only depends on its own sub-seed, so the maps are the same as generating them one at a time."""
+    worker_count = min(len(jobs), workers)
+    if worker_count > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=worker_count) as executor:
+                return list(executor.map(generate_map_data, *zip(*jobs), [instrument] * len(jobs)))
+        except (BrokenProcessPool, OSError, PicklingError) as error:
+            # Some hosts can't start processes from here (e.g. generating inside a daemon process)
+            logging.warning(f"TGL Map Rando: Could not generate maps in parallel, generating them one at a time. "
+                            f"({error})")
+    return [generate_map_data(sub_seed, layout, instrument) for sub_seed, layout in jobs]
@@ -0,0 +1,146 @@
+import argparse
+import mmap
+import os
+import struct
+from random import Random
+from typing import Dict, List, Optional, Tuple
+
+import Utils
+import settings
+from .Locations import TGL_LOCID_BASE
+from .Map import (TGLMapLocation, MAP_DATA_MAX_BYTES, MAP_LAYOUT_GROWTH, MAP_LAYOUT_SPANNING_TREE,
+                  generate_random_map)
+
+
+# Map pools hold pre-generated random maps, so generation can draw one instead of randomizing a new map.
+# File layout (little-endian):
+#   Header: magic, layout, number of maps, record stride
+#   Index:  the sub-seed each map was generated from, one per map
+#   Records, each exactly stride bytes: map data length, location count, map data (writehex output, padded),
+#    then the location table (generic and original location offsets from TGL_LOCID_BASE, X and Y coordinates)
+POOL_MAGIC = b"TGLMAPS1"
+POOL_HEADER = struct.Struct("<8sIII")
+POOL_INDEX_ENTRY = struct.Struct("<Q")
+POOL_RECORD_HEADER = struct.Struct("<HH")
+POOL_LOCATION = struct.Struct("<HHBB")
+POOL_MAX_LOCATIONS = 128  # A map has just over 100 locations
+POOL_MAP_DATA_SIZE = MAP_DATA_MAX_BYTES + 1  # Including the terminator
+POOL_RECORD_STRIDE = POOL_RECORD_HEADER.size + POOL_MAP_DATA_SIZE + (POOL_LOCATION.size * POOL_MAX_LOCATIONS)
+
+
+def pack_map_record(map_data: bytes, locations: Dict[int, TGLMapLocation]) -> bytes:
+    if len(map_data) > POOL_MAP_DATA_SIZE:
+        raise ValueError(f"TGL Map Pool: Map data ({len(map_data)} Bytes) does not fit in a pool record.")
+    if len(locations) > POOL_MAX_LOCATIONS:
+        raise ValueError(f"TGL Map Pool: {len(locations)} locations do not fit in a pool record.")
+    record = bytearray(POOL_RECORD_STRIDE)
+    POOL_RECORD_HEADER.pack_into(record, 0, len(map_data), len(locations))
+    offset = POOL_RECORD_HEADER.size
+    record[offset:offset + len(map_data)] = map_data
+    offset += POOL_MAP_DATA_SIZE
+    for generic_location_id, location in locations.items():
+        POOL_LOCATION.pack_into(record, offset, generic_location_id - TGL_LOCID_BASE,
+                                location.location_id - TGL_LOCID_BASE, location.xcoord, location.ycoord)
+        offset += POOL_LOCATION.size
+    return bytes(record)
+
+
+def unpack_map_record(record: bytes) -> Tuple[bytes, Dict[int, TGLMapLocation]]:
+    map_length, location_count = POOL_RECORD_HEADER.unpack_from(record, 0)
+    offset = POOL_RECORD_HEADER.size
+    map_data = bytes(record[offset:offset + map_length])
+    offset += POOL_MAP_DATA_SIZE
+    locations: Dict[int, TGLMapLocation] = {}
+    for generic_offset, location_offset, xcoord, ycoord in POOL_LOCATION.iter_unpack(
+            record[offset:offset + (POOL_LOCATION.size * location_count)]):
+        locations[TGL_LOCID_BASE + generic_offset] = TGLMapLocation(TGL_LOCID_BASE + location_offset, xcoord, ycoord)
+    return map_data, locations
+
+
+def build_map_pool(path: str, count: int, seed: int, layout: int = MAP_LAYOUT_GROWTH) -> None:
+    random = Random(seed)
+    sub_seeds: List[int] = [random.getrandbits(64) for _ in range(count)]
+    with open(path, "wb") as outfile:
+        outfile.write(POOL_HEADER.pack(POOL_MAGIC, layout, count, POOL_RECORD_STRIDE))
+        for sub_seed in sub_seeds:
+            outfile.write(POOL_INDEX_ENTRY.pack(sub_seed))
+        for sub_seed in sub_seeds:
+            tglmap = generate_random_map(Random(sub_seed), layout)
+            outfile.write(pack_map_record(tglmap.writehex(), tglmap.get_randomized_item_locations()))
+
+
+class TGLMapPool:
+    """A map pool file, memory-mapped so drawing a map only reads that map's record."""
+    layout: int
+    sub_seeds: List[int]
+
+    def __init__(self, path: str):
+        with open(path, "rb") as infile:
+            self.data = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.layout, count, stride = POOL_HEADER.unpack_from(self.data, 0)
+        if magic != POOL_MAGIC or stride != POOL_RECORD_STRIDE:
+            self.data.close()
+            raise ValueError(f"TGL Map Pool: {path} is not a map pool file for this version.")
+        index_start = POOL_HEADER.size
+        self.records_start = index_start + (POOL_INDEX_ENTRY.size * count)
+        if len(self.data) < self.records_start + (stride * count):
+            self.data.close()
+            raise ValueError(f"TGL Map Pool: {path} is missing map records.")
+        self.sub_seeds = [sub_seed for sub_seed, in POOL_INDEX_ENTRY.iter_unpack(
+            self.data[index_start:self.records_start])]
+
+    def __len__(self) -> int:
+        return len(self.sub_seeds)
+
+    def read(self, index: int) -> Tuple[bytes, Dict[int, TGLMapLocation]]:
+        # Map data and location table of one map
+        start = self.records_start + (index * POOL_RECORD_STRIDE)
+        return unpack_map_record(self.data[start:start + POOL_RECORD_STRIDE])
+
+    def choose(self, random: Random) -> Tuple[bytes, Dict[int, TGLMapLocation]]:
+        return self.read(random.randrange(len(self)))
+
+    def close(self):
+        self.data.close()
+
+
+map_pools: Dict[str, Optional[TGLMapPool]] = {}  # Pools opened by this process, by path
+
+
+def get_map_pool(layout: int) -> Optional[TGLMapPool]:
+    # The pool set as map_pool_file in the guardianlegend_options host settings, if there is one for this layout
+    try:
+        file_name = settings.get_settings()["guardianlegend_options"]["map_pool_file"]
+    except (KeyError, AttributeError):
+        return None
+    if not file_name:
+        return None
+    if not os.path.exists(file_name):
+        file_name = Utils.user_path(file_name)
+    if file_name not in map_pools:
+        map_pools[file_name] = TGLMapPool(file_name) if os.path.exists(file_name) else None
+    pool = map_pools[file_name]
+    if (pool is None) or (len(pool) == 0) or (pool.layout != layout):
+        return None
+    return pool
+
+
+def get_map_generation_workers() -> int:
+    # Worker processes for generating maps, set as map_generation_workers in the guardianlegend_options host settings.
+    # Maps are generated in this process unless it's set above 1.
+    try:
+        return int(settings.get_settings()["guardianlegend_options"]["map_generation_workers"] or 0)
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate a pool of The Guardian Legend random maps.")
+    parser.add_argument("path", help="Map pool file to write")
+    parser.add_argument("--count", type=int, default=1000, help="Number of maps to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed the maps' sub-seeds are drawn from")
+    parser.add_argument("--layout", choices=["growth", "spanning_tree"], default="growth",
+                        help="Map layout generator, as in the map_layout option")
+    args = parser.parse_args()
+    build_map_pool(args.path, args.count, args.seed,
+                   MAP_LAYOUT_SPANNING_TREE if args.layout == "spanning_tree" else MAP_LAYOUT_GROWTH)
@@ -77,6 +77,25 @@ class RandomizeMap(Toggle):
     Randomization algorithm adapted from Fireball87: https://github.com/fireball87/GuardianLegendRando"""
     display_name = "Enable Map Randomization"
 
+
+class MapLayout(Choice):
+    """Determines how the room layout of each Area is generated when the map is randomized.
+    Has no effect unless Map Randomization is enabled.
+
+    Growth: Areas grow outward one room at a time from their entrance (the original map randomizer behavior).
+    Spanning Tree: Areas are built from random walks that branch out from the entrance, giving more winding paths."""
+    display_name = "Map Layout"
+    option_growth = 0
+    option_spanning_tree = 1
+    default = 0
+
+
+class UseMapPool(Toggle):
+    """Draws the randomized map from the host's pre-generated map pool, instead of generating a new one.
+    Has no effect unless Map Randomization is enabled. If the host has no map pool for the chosen Map Layout,
+    a new map is generated as usual."""
+    display_name = "Use Map Pool"
+
 '''
 class RandomizeCorridors(Toggle):
     """This is an EXPERIMENTAL setting! Randomizes the backgrounds and enemy spawns of Corridors.
@@ -104,6 +123,8 @@ class TGLOptions(PerGameCommonOptions):
     item_gating: ItemGating
     corridor_hints: CorridorHints
     randomize_map: RandomizeMap
+    map_layout: MapLayout
+    use_map_pool: UseMapPool
     #randomize_corridors: RandomizeCorridors
     #balanced_enemies: RebalanceEnemies
     #death_link: DeathLink
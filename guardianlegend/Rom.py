@@ -1,12 +1,15 @@
+import hashlib
 import os
-from typing import TYPE_CHECKING, Tuple, Dict, List, Optional
+from enum import IntEnum
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Mapping, NamedTuple, Tuple, Dict, List, Optional
 
 import Utils
 import settings
 from BaseClasses import ItemClassification as IC
 from worlds.Files import APProcedurePatch, APTokenTypes, APTokenMixin
 from .Items import TGL_ITEMID_BASE, balanced_rapid_fire
-from .Locations import TGL_LOCID_BASE
+from .Locations import TGL_LOCID_BASE, location_table
 from .Options import TGLOptions
 from .Map import TGLMap
 
@@ -104,6 +107,74 @@ corridor_hints_length = {
     "medium": [12, 15, 16, 18],
     "long":   [13, 14, 17]
 }
+# Most bytes a hint of each size can take up, including the end of message (the documented limits above)
+corridor_hints_size_limit = {
+    "short":  43,
+    "medium": 56,
+    "long":   87
+}
+
+
+def build_corridor_hint_capacity() -> Dict[int, int]:
+    # Bytes each Corridor's hint can take up: the limit for its hint size, 
+    #  and never more than the space before the next Corridor's hint
+    capacity: Dict[int, int] = {}
+    hint_addresses = sorted(corridor_hints_addresses.values())
+    for size, corridor_numbers in corridor_hints_length.items():
+        for cnum in corridor_numbers:
+            address = corridor_hints_addresses[cnum]
+            capacity[cnum] = corridor_hints_size_limit[size]
+            following = [next_address for next_address in hint_addresses if next_address > address]
+            if following:
+                capacity[cnum] = min(capacity[cnum], following[0] - address)
+    return capacity
+
+
+corridor_hints_capacity = build_corridor_hint_capacity()
+
+
+class TGLLocationKind(IntEnum):
+    GROUND = 1  # Ground or Miniboss drop
+    TRIPLE_SHOP = 2  # Middle item of a 3-item shop, the left and right items get junk
+    SINGLE_SHOP = 3
+    CORRIDOR = 4
+    CORRIDOR_BONUS = 5  # Remote, never displayed in-game
+
+
+class TGLLocationPatch(NamedTuple):
+    kind: TGLLocationKind
+    rom_address: int  # Where the location's item is written, 0 if it isn't written to ROM
+    hint_slot: Optional[int]  # Key of the item's classification for Corridor 11-20 hints
+
+
+def build_location_patch(location_code: int) -> TGLLocationPatch:
+    # Original location codes are grouped by thousands, and offset within the group by their ROM table index
+    location_type, location_index = divmod(location_code - TGL_LOCID_BASE, 1000)
+    if location_type == 1:
+        return TGLLocationPatch(TGLLocationKind.GROUND, 0x16388 + location_index - 1, None)
+    elif location_type == 2:
+        if location_index > 100:
+            return TGLLocationPatch(TGLLocationKind.TRIPLE_SHOP, (0x1605e + (location_index - 100)) + 1, None)
+        return TGLLocationPatch(TGLLocationKind.SINGLE_SHOP, 0x16077 + location_index, None)
+    elif location_type == 3:
+        return TGLLocationPatch(TGLLocationKind.CORRIDOR, 0x1ef51 + location_index - 1, 
+                                location_index if location_index > 10 else None)
+    elif location_type == 4:
+        return TGLLocationPatch(TGLLocationKind.CORRIDOR_BONUS, 0x0, 
+                                location_index + 100 if location_index > 10 else None)
+    raise Exception('Invalid location ID found for The Guardian Legend.')
+
+
+# Original location code -> how its item is patched, shared by every slot
+location_patch_table: Mapping[int, TGLLocationPatch] = MappingProxyType(
+    {data.code: build_location_patch(data.code) for data in location_table.values() if data.code is not None})
+
+
+def get_location_patch_table(world: "TGLWorld", options: TGLOptions) -> Mapping[int, TGLLocationPatch]:
+    if options.randomize_map:
+        # Map rando's generic locations are patched as the original locations placed in their rooms
+        return {code: location_patch_table[location.location_id] for code, location in world.tgl_map_snapshot.items()}
+    return location_patch_table
 
 
 class TGLProcedurePatch(APProcedurePatch, APTokenMixin):
@@ -119,106 +190,45 @@ class TGLProcedurePatch(APProcedurePatch, APTokenMixin):
         return get_base_rom_as_bytes()
 
  
-def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatch) -> None:
-    corridor_hint_items: Dict[int, IC] = {}
-
-    # Note: Test prints for determining filled location addresses
-    #print("")
-    #for location in world.multiworld.get_filled_locations(world.player): 
-    #    print(location.name + " " + str(location.address))
-    #TEST DONE
-
-    for location in world.multiworld.get_filled_locations(world.player):
-        if location.address is not None:
-            #print("Loc addr: " + str(location.address))
-            # Determine location type: Ground drop, Shop, Corridor Drop, or Key/Boss
-            location_data: List[int] = []
-            if options.randomize_map:
-                # Use the stored random location data to get the original ROM location info
-                randomized_location_data: int = world.tgl_random_locations[location.address][0]
-                location_data_split = divmod(get_internal_loc_id(randomized_location_data), 1000)
-                location_data = list(location_data_split)
-            else:
-                location_data_split = divmod(get_internal_loc_id(location.address), 1000)
-                location_data = list(location_data_split)
-            location_rom_address = 0x0
-            if location_data[0] == 1:
-                # Ground or Miniboss drop 
-                location_rom_address = 0x16388 + location_data[1] - 1
-            
-            # Triple Item Shop
-            elif location_data[0] == 2:
-                # Fill in 3-item shops with junk
-                if location_data[1] > 100:
-                    # middle shop location will hold the item, left and right get junk
-                    location_rom_address = (0x1605e + (location_data[1] - 100)) + 1
-                    patch.write_token(
-                        APTokenTypes.WRITE, 
-                        location_rom_address-1,
-                        SHOP_JUNK_ITEM.to_bytes(1, 'big')
-                    )
-                    patch.write_token(
-                        APTokenTypes.WRITE, 
-                        location_rom_address+1,
-                        SHOP_JUNK_ITEM.to_bytes(1, 'big')
-                    )
-                else:
-                    location_rom_address = 0x16077 + location_data[1]
-                
-            # Corridor Item 
-            elif location_data[0] == 3:
-                location_rom_address = 0x1ef51 + location_data[1] - 1
-                if location_data[1] > 10:
-                    corridor_hint_items[location_data[1]] = location.item.classification
-
-            # Corridor bonus items, these are remote and not displayed in-game
-            elif location_data[0] == 4:
-                if location_data[1] > 10:
-                    # Store the classification for Corridor 11-20 items for hints
-                    corridor_hint_items[location_data[1]+100] = location.item.classification
-            else:
-                raise Exception('Invalid location ID found for The Guardian Legend.')
-            
-            # This should only be skipped if case 4 hit above because this is a Corridor item never shown in game
-            # - Prevents the ROM header being edited and ROM failing to load 
-            if location_rom_address != 0:
-                # Local item: can change directly
-                if location.item and location.item.player == world.player:
-                    item_data: Tuple = divmod(get_internal_item_id(location.item.code), 1000)
-            
-                    # Check whether this is a drop item or a key
-                    if item_data[0] == 1:
-                        # Drop item
-                        patch.write_token(
-                            APTokenTypes.WRITE, 
-                            location_rom_address,
-                            item_data[1].to_bytes(1, 'big')
-                        )    
-                    elif item_data[0] == 2:
-                        # Key item - treat as remote item
-                        patch.write_token(
-                            APTokenTypes.WRITE, 
-                            location_rom_address,
-                            AP_ITEM_CODE.to_bytes(1, 'big')
-                        )
-                    else:
-                        raise Exception('Invalid item ID found for The Guardian Legend.')
-
-                # APItem: Set sprite to Red Chip in-game
-                else:
-                    patch.write_token(
-                        APTokenTypes.WRITE, 
-                        location_rom_address,
-                        AP_ITEM_CODE.to_bytes(1, 'big')
-                    )
-
-    ## Core changes ##
+class TGLPatchWrites:
+    """Collects a patch's writes by ROM address, so they can be written out as the fewest WRITE tokens.
+    A later write to the same address replaces the earlier one, the same as applying the writes in order."""
+
+    def __init__(self, base: Optional["TGLPatchWrites"] = None):
+        self.rom_bytes: Dict[int, int] = dict(base.rom_bytes) if base is not None else {}
+
+    def write(self, address: int, data: bytes) -> None:
+        self.rom_bytes.update(zip(range(address, address + len(data)), data))
+
+    def get_runs(self) -> List[Tuple[int, bytes]]:
+        # Contiguous (start address, bytes) runs, in address order
+        runs: List[Tuple[int, bytes]] = []
+        run_start = -1
+        run = bytearray()
+        for address in sorted(self.rom_bytes):
+            if address != run_start + len(run):
+                if run:
+                    runs.append((run_start, bytes(run)))
+                run_start = address
+                run = bytearray()
+            run.append(self.rom_bytes[address])
+        if run:
+            runs.append((run_start, bytes(run)))
+        return runs
+
+    def write_tokens(self, patch: APTokenMixin) -> None:
+        for address, data in self.get_runs():
+            patch.write_token(APTokenTypes.WRITE, address, data)
+
+
+def build_static_patch_writes() -> TGLPatchWrites:
+    # Core changes that are the same for every slot, so they only need to be built once per process
+    writes = TGLPatchWrites()
 
     # Remove the YOU GOT KEY popup in Corridors (TODO: Add to all Corridors, change message)
     # 0xEA is No-OP, removing the branch to the YOU GOT ITEM subroutine
     corridor_reward_popup_byte = 0x1F552
-    patch.write_token(
-        APTokenTypes.WRITE, 
+    writes.write(
         corridor_reward_popup_byte,
         0xEAEA.to_bytes(2, 'big')
     )
@@ -232,32 +242,27 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
     shop_message_start = 0x15C16
 
     # No-op loading left item sprite data
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         left_shop_item_jump,
         0xEAEAEA.to_bytes(3, 'big')
     )
     # No-op loading right item sprite data
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         right_shop_item_jump,
         0xEAEAEA.to_bytes(3, 'big')
     )
     # Bump the compare counter by one, start on 2nd item
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         shop_item_counter,
         0x07.to_bytes(1, 'big')
     )
     # Bump the item data pointer by one, start on 2nd item
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         item_data_pointer,
         0x51.to_bytes(1, 'big')
     )
     # No-op the loop branch so only one item's data loads
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         branch_to_load_items,
         0xEAEA.to_bytes(2, 'big')
     )
@@ -266,8 +271,7 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
     new_shop_text = ("Yum yum,", "Power Chips,", "gimme gimme!")
     new_shop_bytes = encode_text_to_bytes(new_shop_text)
     new_shop_bytes.append(TEXT_END_MESSAGE)
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         shop_message_start,
         bytes(new_shop_bytes)
     )
@@ -280,8 +284,7 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
     )
     new_save_room_bytes = encode_text_to_bytes(new_save_room_text)
     new_save_room_bytes.append(TEXT_END_MESSAGE) 
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         save_room_text_data,
         bytes(new_save_room_bytes)
     )
@@ -289,36 +292,14 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
     # Remove the password menu option
     game_start_jump = 0x458
     # Changes the cursor handler to an empty loop, can never select PASSWORD screen
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         game_start_jump,
         0x4C3D84.to_bytes(3, 'big')
     )
 
-    # Change the PASSWORD CONTINUE text to the player's slot name (mostly...)
-    password_continue_text_data = 0x88D
-    player_slotname_limited = world.multiworld.player_name[world.player][:17].upper()
-    for _ in range(17 - len(player_slotname_limited)):
-        player_slotname_limited += " "
-    player_slotname_bytes = bytearray()
-    for c in player_slotname_limited:
-        if (ord(c) in range(0x30, 0x3A)) or (ord(c) in range(0x41, 0x5B)):
-            player_slotname_bytes.append(ord(c))
-        elif (c == " ") or (c == "-") or (c == "_"):
-            player_slotname_bytes.append(0x20)
-        else:
-            # Any character we can't display gets a nice star sprite :)
-            player_slotname_bytes.append(0x25)
-    patch.write_token(
-        APTokenTypes.WRITE,
-        password_continue_text_data,
-        bytes(player_slotname_bytes)
-    )
-
     # Disable the password screen in save rooms, no-op branch on pressing 'A'
     saveroom_branch_to_password = 0x162D3
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         saveroom_branch_to_password,
         0xEAEA.to_bytes(2, 'big')
     )
@@ -332,8 +313,7 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
     helpful_lander_new_bytes = encode_text_to_bytes(helpful_lander_new_text)
     helpful_lander_new_bytes.append(TEXT_END_MESSAGE)
 
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         helpful_lander_text_data,
         bytes(helpful_lander_new_bytes)
     )
@@ -342,17 +322,105 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
     # Remove screen flashes from EE use and Naju explosion cutscene (from Fireball87 rando)
     ee_flash = 0x18BBD
     end_flash = 0x894C
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         ee_flash,
         0x0F.to_bytes(1, 'big')
     )
-    patch.write_token(
-        APTokenTypes.WRITE,
+    writes.write(
         end_flash,
         0x0F.to_bytes(1, 'big')
     )
     
+    # Main corridor hint text
+    corridor_hint_main_text_data = 0x159C6
+    # This text has to be exact length because it flows into another line
+    corridor_hint_main_new_text = (
+        "The corridor", "locks are now", "broken!    ",
+        "Defeat the", "monsters that", "are infesting",
+        "them to get", "valuable items."
+    )
+    corridor_hint_main_new_bytes = encode_text_to_bytes(corridor_hint_main_new_text)
+    corridor_hint_main_new_bytes.append(TEXT_NEXTPAGE)
+    writes.write(
+        corridor_hint_main_text_data,
+        bytes(corridor_hint_main_new_bytes)
+    )
+    return writes
+
+
+def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatch) -> None:
+    # Everything that is the same for every slot was prepared once, see build_static_patch_writes
+    writes = TGLPatchWrites(static_patch_writes)
+
+    corridor_hint_items: Dict[int, IC] = {}
+    location_patches = get_location_patch_table(world, options)
+
+    # Note: Test prints for determining filled location addresses
+    #print("")
+    #for location in world.multiworld.get_filled_locations(world.player): 
+    #    print(location.name + " " + str(location.address))
+    #TEST DONE
+
+    for location in world.multiworld.get_filled_locations(world.player):
+        if location.address is not None:
+            location_patch = location_patches.get(location.address)
+            if location_patch is None:
+                raise Exception('Invalid location ID found for The Guardian Legend.')
+            location_rom_address = location_patch.rom_address
+            if location_patch.hint_slot is not None:
+                # Store the classification for Corridor 11-20 items for hints
+                corridor_hint_items[location_patch.hint_slot] = location.item.classification
+            if location_patch.kind == TGLLocationKind.TRIPLE_SHOP:
+                # middle shop location will hold the item, left and right get junk
+                writes.write(
+                    location_rom_address-1,
+                    SHOP_JUNK_ITEM.to_bytes(1, 'big')
+                )
+                writes.write(
+                    location_rom_address+1,
+                    SHOP_JUNK_ITEM.to_bytes(1, 'big')
+                )
+
+            # This should only be skipped for Corridor bonus items, because they are never shown in game
+            # - Prevents the ROM header being edited and ROM failing to load 
+            if location_rom_address != 0:
+                # Local item: can change directly
+                if location.item and location.item.player == world.player:
+                    item_data: Tuple = divmod(get_internal_item_id(location.item.code), 1000)
+            
+                    # Check whether this is a drop item or a key
+                    if item_data[0] == 1:
+                        # Drop item
+                        writes.write(
+                            location_rom_address,
+                            item_data[1].to_bytes(1, 'big')
+                        )    
+                    elif item_data[0] == 2:
+                        # Key item - treat as remote item
+                        writes.write(
+                            location_rom_address,
+                            AP_ITEM_CODE.to_bytes(1, 'big')
+                        )
+                    else:
+                        raise Exception('Invalid item ID found for The Guardian Legend.')
+
+                # APItem: Set sprite to Red Chip in-game
+                else:
+                    writes.write(
+                        location_rom_address,
+                        AP_ITEM_CODE.to_bytes(1, 'big')
+                    )
+
+    # Change the PASSWORD CONTINUE text to the player's slot name (mostly...)
+    password_continue_text_data = 0x88D
+    player_slotname_limited = world.multiworld.player_name[world.player][:17].upper()
+    for _ in range(17 - len(player_slotname_limited)):
+        player_slotname_limited += " "
+    writes.write(
+        password_continue_text_data,
+        player_slotname_limited.encode("ascii", "replace").translate(slot_name_translation)
+    )
+
     ## Options-based changes ##
 
     # Map Randomization
@@ -361,12 +429,11 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
     # TODO: Future version may affect item distribution
     if options.randomize_map:
         map_data_start = 0x14A7E
-        map_hex: bytearray = world.tgl_random_map.writehex()
+        map_hex: bytes = world.tgl_map_snapshot.map_data
         #print(map_hex.hex(" ", 1))
-        patch.write_token(
-            APTokenTypes.WRITE,
+        writes.write(
             map_data_start,
-            bytes(map_hex)
+            map_hex
         )
 
 
@@ -374,34 +441,18 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
     if options.balanced_rapid_fire:
         rapid_fire_byte = 0x87DE
         for i in range(6):
-            patch.write_token(
-                APTokenTypes.WRITE, 
+            writes.write(
                 rapid_fire_byte+i,
                 balanced_rapid_fire[i].to_bytes(1, 'big')
             )
         
     # Corridor hints
-    corridor_hint_main_text_data = 0x159C6
-    # This text has to be exact length because it flows into another line
-    corridor_hint_main_new_text = (
-        "The corridor", "locks are now", "broken!    ",
-        "Defeat the", "monsters that", "are infesting",
-        "them to get", "valuable items."
-    )
-    corridor_hint_main_new_bytes = encode_text_to_bytes(corridor_hint_main_new_text)
-    corridor_hint_main_new_bytes.append(TEXT_NEXTPAGE)
-    patch.write_token(
-        APTokenTypes.WRITE,
-        corridor_hint_main_text_data,
-        bytes(corridor_hint_main_new_bytes)
-    )
-
     # Determine which corridors get "real" hints
     corridor_hint_selections = world.random.sample(range(11, 21), options.corridor_hints.value)
 
     # For each corridor, determine which hint to give 
     for cnum in range(11, 21):
-        corridor_hint_text_choice: Tuple[str]
+        corridor_hint_text_choice: TGLHintText
         corridor_hint_size_choice: str = ""
         if cnum in corridor_hints_length["long"]:
             corridor_hint_size_choice = "long"
@@ -414,37 +465,37 @@ def write_tokens(world: "TGLWorld", options: TGLOptions, patch: TGLProcedurePatc
             # Determine hint level
             if (((corridor_hint_items[cnum] & IC.progression) == IC.progression) 
                   or ((corridor_hint_items[cnum+100] & IC.progression) == IC.progression)):
-                corridor_hint_text_choice = world.random.choice(corridor_hints_progression[corridor_hint_size_choice])
+                corridor_hint_text_choice = world.random.choice(
+                    corridor_hint_texts["progression"][corridor_hint_size_choice])
             elif (((corridor_hint_items[cnum] & IC.useful) == IC.useful)
                     or ((corridor_hint_items[cnum+100] & IC.useful) == IC.useful)):
-                corridor_hint_text_choice = world.random.choice(corridor_hints_useful[corridor_hint_size_choice])
+                corridor_hint_text_choice = world.random.choice(
+                    corridor_hint_texts["useful"][corridor_hint_size_choice])
             else:
                 # Traps may cause text to appear as "useful" rather than "filler"
                 if (((corridor_hint_items[cnum] & IC.trap) == IC.trap)
                       or ((corridor_hint_items[cnum+100] & IC.trap) == IC.trap)):
                     if world.random.randint(0, 1) == 1:
                         corridor_hint_text_choice = world.random.choice(
-                            corridor_hints_useful[corridor_hint_size_choice])
+                            corridor_hint_texts["useful"][corridor_hint_size_choice])
                     else:
                         corridor_hint_text_choice = world.random.choice(
-                            corridor_hints_filler[corridor_hint_size_choice])
+                            corridor_hint_texts["filler"][corridor_hint_size_choice])
                 else:
                     corridor_hint_text_choice = world.random.choice(
-                        corridor_hints_filler[corridor_hint_size_choice])   
+                        corridor_hint_texts["filler"][corridor_hint_size_choice])   
         else:
             # Junk text
-            corridor_hint_text_choice = world.random.choice(corridor_hints_junk[corridor_hint_size_choice])
+            corridor_hint_text_choice = world.random.choice(corridor_hint_texts["junk"][corridor_hint_size_choice])
 
         # Write hint text to corresponding corridor hint location
-        hintbytes = encode_text_to_bytes(corridor_hint_text_choice, cnum)
-        hintbytes.append(TEXT_END_MESSAGE)
-        patch.write_token(
-            APTokenTypes.WRITE,
+        writes.write(
             corridor_hints_addresses[cnum],
-            bytes(hintbytes)
+            corridor_hint_text_choice.for_corridor(cnum)
         )
 
     # Finish, write patch file
+    writes.write_tokens(patch)
     patch.write_file("tgl_token_data.bin", patch.get_token_binary())
     
     
@@ -473,21 +524,36 @@ def get_internal_loc_id(loc_id: int) -> int:
     return (loc_id - TGL_LOCID_BASE)
 
 
+base_rom_cache: Dict[str, Tuple[int, int, bytes]] = {}  # ROM path -> size, mtime and contents, once verified
+
+
 def get_base_rom_as_bytes() -> bytes:
     options = settings.get_settings()
     file_name = options["guardianlegend_options"]["rom_file"]
     if not os.path.exists(file_name):
         file_name = Utils.user_path(file_name)
-    with open(file_name, "rb") as infile:
-        base_rom_bytes = bytes(infile.read())
+    return load_base_rom(file_name)
+
 
+def load_base_rom(file_name: str) -> bytes:
+    # Reads and verifies the ROM once per process, then hands every caller the same (immutable) bytes
+    #  until the file changes
+    file_name = os.path.abspath(file_name)
+    file_stat = os.stat(file_name)
+    cached = base_rom_cache.get(file_name)
+    if (cached is not None) and (cached[0] == file_stat.st_size) and (cached[1] == file_stat.st_mtime_ns):
+        return cached[2]
+    with open(file_name, "rb") as infile:
+        base_rom_bytes = infile.read()
+    if hashlib.md5(base_rom_bytes).hexdigest() != TGLProcedurePatch.hash:
+        raise Exception("Supplied Base ROM does not match the known MD5 for The Guardian Legend (NES). "
+                        "Get the correct game and version, then dump it.")
+    base_rom_cache[file_name] = (file_stat.st_size, file_stat.st_mtime_ns, base_rom_bytes)
     return base_rom_bytes
 
 
-# Take a message in String-Tuple format and encode as a TGL-friendly string.
-# Messages have 3 lines per page, but can have 4 if it's the last page.
-# TGL uses mostly ASCII but has some outliers, so special encoding is performed.
-def encode_text_to_bytes(textdata: Tuple[str], corridor_number: Optional[int] = 99) -> bytearray:
+def build_text_translation() -> bytes:
+    # TGL uses mostly ASCII but has some outliers, and anything it can't display becomes '?'
     tgl_special_chars = {
         " ": 0x0B,
         ";": 0x3B,
@@ -498,7 +564,44 @@ def encode_text_to_bytes(textdata: Tuple[str], corridor_number: Optional[int] =
         ".": 0x5B,
         "!": 0x5D,
     }
+    table = bytearray([0x3F]) * 256
+    for c in range(0x30, 0x3A):
+        table[c] = c
+    for c in range(0x41, 0x5B):
+        table[c] = c
+    for c in range(0x61, 0x7B):
+        table[c] = c
+    for c, tgl_char in tgl_special_chars.items():
+        table[ord(c)] = tgl_char
+    return bytes(table)
+
+
+text_translation = build_text_translation()
+
+
+def build_slot_name_translation() -> bytes:
+    # The title screen font only has digits and capitals.
+    # Any character we can't display gets a nice star sprite :)
+    table = bytearray([0x25]) * 256
+    for c in range(0x30, 0x3A):
+        table[c] = c
+    for c in range(0x41, 0x5B):
+        table[c] = c
+    for c in " -_":
+        table[ord(c)] = 0x20
+    return bytes(table)
+
+
+slot_name_translation = build_slot_name_translation()
+
+
+# Take a message in String-Tuple format and encode as a TGL-friendly string.
+# Messages have 3 lines per page, but can have 4 if it's the last page.
+# Using the pound sign as a stand in for "insert relevant Corridor number here", 
+#  two bytes are left for the number at each of the returned offsets.
+def encode_text(textdata: Tuple[str, ...]) -> Tuple[bytearray, List[int]]:
     newtext_bytes = bytearray()
+    number_offsets: List[int] = []
     pages = divmod(len(textdata), 3)
     pagecount = pages[0]
     if pages[1] == 1:
@@ -509,19 +612,11 @@ def encode_text_to_bytes(textdata: Tuple[str], corridor_number: Optional[int] =
     for textline in textdata:
         linecount += 1
 
-        for c in textline:
-            if (ord(c) in range(0x30, 0x3A)) or (ord(c) in range(0x41, 0x5B)) or (ord(c) in range(0x61, 0x7B)):
-                newtext_bytes.append(ord(c))
-            elif c == "#":
-                # Using the pound sign as a stand in for "insert relevant Corridor number here"
-                # Always 2 characters for hints
-                newtext_bytes.append(ord(str(corridor_number)[0]))
-                newtext_bytes.append(ord(str(corridor_number)[1]))
-            elif c in tgl_special_chars.keys():
-                newtext_bytes.append(tgl_special_chars[c])
-            else:
-                # Handle non-standard characters, replace with '?'
-                newtext_bytes.append(0x3F)
+        for part_number, part in enumerate(textline.split("#")):
+            if part_number > 0:
+                number_offsets.append(len(newtext_bytes))
+                newtext_bytes.extend(b"##")
+            newtext_bytes.extend(part.encode("ascii", "replace").translate(text_translation))
         
         if linecount == len(textdata):
             # Some messages need different end of message handling, do this outside of call
@@ -532,4 +627,59 @@ def encode_text_to_bytes(textdata: Tuple[str], corridor_number: Optional[int] =
             newtext_bytes.append(TEXT_NEXTPAGE)     
         else:
             newtext_bytes.append(TEXT_NEWLINE)
+    return newtext_bytes, number_offsets
+
+
+def encode_text_to_bytes(textdata: Tuple[str, ...], corridor_number: Optional[int] = 99) -> bytearray:
+    newtext_bytes, number_offsets = encode_text(textdata)
+    # Always 2 characters for hints
+    number_bytes = str(corridor_number).encode()[:2]
+    for offset in number_offsets:
+        newtext_bytes[offset:offset + 2] = number_bytes
     return newtext_bytes
+
+
+class TGLHintText(NamedTuple):
+    """A corridor hint, encoded ahead of time with its end of message, apart from the Corridor number."""
+    text_bytes: bytes
+    number_offsets: Tuple[int, ...]
+
+    def for_corridor(self, corridor_number: int) -> bytes:
+        hint_bytes = bytearray(self.text_bytes)
+        number_bytes = str(corridor_number).encode()[:2]
+        for offset in self.number_offsets:
+            hint_bytes[offset:offset + 2] = number_bytes
+        return bytes(hint_bytes)
+
+
+def check_hint_length(text: Tuple[str, ...], hint_bytes: bytes, corridor_number: int) -> None:
+    if len(hint_bytes) > corridor_hints_capacity[corridor_number]:
+        raise Exception(f"Corridor hint {text} is {len(hint_bytes)} bytes, but Corridor {corridor_number}'s hint "
+                        f"only has room for {corridor_hints_capacity[corridor_number]}.")
+
+
+def build_hint_texts(hints: Dict[str, List[Tuple[str, ...]]]) -> Dict[str, List[TGLHintText]]:
+    # Encode every hint once, and make sure it fits in the text of each Corridor it can be used for
+    hint_texts: Dict[str, List[TGLHintText]] = {}
+    for size, texts in hints.items():
+        hint_texts[size] = []
+        for text in texts:
+            hint_bytes, number_offsets = encode_text(text)
+            hint_bytes.append(TEXT_END_MESSAGE)
+            for cnum in corridor_hints_length[size]:
+                check_hint_length(text, hint_bytes, cnum)
+            hint_texts[size].append(TGLHintText(bytes(hint_bytes), tuple(number_offsets)))
+    return hint_texts
+
+
+# Encoded corridor hints by hint level, then by size
+corridor_hint_texts: Dict[str, Dict[str, List[TGLHintText]]] = {
+    "junk": build_hint_texts(corridor_hints_junk),
+    "filler": build_hint_texts(corridor_hints_filler),
+    "useful": build_hint_texts(corridor_hints_useful),
+    "progression": build_hint_texts(corridor_hints_progression),
+}
+
+
+# Every slot's patch starts with these
+static_patch_writes = build_static_patch_writes()
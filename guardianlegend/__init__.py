@@ -1,6 +1,7 @@
+import logging
 from typing import List, Dict, Tuple, Optional, Any
 
-from BaseClasses import Region, Tutorial
+from BaseClasses import MultiWorld, Region, Tutorial
 from worlds.AutoWorld import WebWorld, World
 from .Items import TGLItem, TGLItemData, item_table, event_item_table, get_item_count
 from .Locations import (TGLLocation, TGL_LOCID_BASE, TGL_LOCID_BONUS_GENERIC, location_table, location_table_generic,  
@@ -8,7 +9,8 @@ from .Locations import (TGLLocation, TGL_LOCID_BASE, TGL_LOCID_BONUS_GENERIC, lo
 from .Options import TGLOptions
 from .Regions import create_regions
 from .Rules import set_rules
-from .Map import TGLMap
+from .Map import TGLMapSnapshot, generate_random_maps
+from .MapPool import get_map_pool, get_map_generation_workers
 from .Rom import generate_output
 from .Client import TGLClient
 
@@ -34,8 +36,9 @@ class TGLWorld(World):
     web = TGLWebWorld()
     options_dataclass = TGLOptions
     options: TGLOptions
-    tgl_random_map: Optional[TGLMap]
-    tgl_random_locations: Optional[Dict[int, Tuple[int, int, int]]]
+    # Randomized map data and location table (generic location ID -> original location ID and XY coordinates)
+    tgl_map_snapshot: Optional[TGLMapSnapshot]
+    tgl_map_seed: Optional[int] = None  # Sub-seed for the map generated in stage_generate_early
     
     # combining Dicts like this is Py 3.9+ apparently...
     location_name_to_id = ({name: data.code for name, data in location_table.items()}
@@ -43,18 +46,34 @@ class TGLWorld(World):
     item_name_to_id = {name: data.code for name, data in item_table.items()}
 
     def generate_early(self) -> None:
-        # If map rando option is set, need to randomize map here and pull out item location info
+        # If map rando option is set, need to pick the map here so its item location info is ready for regions
         if self.options.randomize_map:
-            self.tgl_random_map = TGLMap()
-            self.tgl_random_map.randomizeMap(self)
-            #self.tgl_random_map.print_maps() # NOTE: For testing only, could be a logging option?
-            # generic location ID as key
-            # original location ID and the XY coordinates (for entrance hints) as data. 
-            self.tgl_random_locations = self.tgl_random_map.get_randomized_item_locations()
-            # NOTE: Test info - list of generate random location IDs
-            #print("")
-            #print(self.tgl_random_locations)
-            #print("")
+            map_pool = get_map_pool(self.options.map_layout.value) if self.options.use_map_pool else None
+            if map_pool is not None:
+                # Pre-generated maps come with their location table, so they are ready to use as they are
+                self.tgl_map_snapshot = TGLMapSnapshot.from_locations(*map_pool.choose(self.random))
+                return
+            # The map itself is generated in stage_generate_early, together with every other slot's map
+            self.tgl_map_seed = self.random.getrandbits(64)
+
+    @classmethod
+    def stage_generate_early(cls, multiworld: MultiWorld) -> None:
+        worlds: List[TGLWorld] = [world for world in multiworld.get_game_worlds(cls.game)
+                                  if world.tgl_map_seed is not None]
+        if not worlds:
+            return
+        # Map stats are only collected when they would actually be logged
+        instrument = logging.getLogger().isEnabledFor(logging.DEBUG)
+        results = generate_random_maps([(world.tgl_map_seed, world.options.map_layout.value) for world in worlds],
+                                       instrument, get_map_generation_workers())
+        for world, (snapshot, attempts, stats) in zip(worlds, results):
+            world.tgl_map_snapshot = snapshot
+            if attempts["map"] > 1:
+                logging.info(f"The Guardian Legend: Map for {world.player_name} took {attempts['map']} attempts.")
+            if stats is not None:
+                logging.debug(f"The Guardian Legend: Map stats for {world.player_name}: {stats}")
+                logging.debug(f"The Guardian Legend: Map locations for {world.player_name}: "
+                              f"{dict(snapshot.items())}")
 
     # In order to know which location IDs to send in map rando, client needs a Dict of RAM bitflags to location IDs
     def fill_slot_data(self) -> Dict[str, Any]:
@@ -67,11 +86,11 @@ class TGLWorld(World):
         slot_data["randomized_map"] = self.options.randomize_map.value
         location_ids: Dict[str, int] = {}
         if self.options.randomize_map:
-            for code, data in self.tgl_random_locations.items():
+            for code, data in self.tgl_map_snapshot.items():
                 # If this is a bonus location, skip it because it has no associated bitflag
                 # Corridor bonus ids are the highest so just check this ID is lower
                 if (code < TGL_LOCID_BONUS_GENERIC):
-                    bitflag: Tuple[int, int] = location_address_lookup[data[0]]
+                    bitflag: Tuple[int, int] = location_address_lookup[data.location_id]
                     bitflag_str = f"{bitflag[0]},{bitflag[1]}"
                     location_ids[bitflag_str] = code
         slot_data["randomized_location_ids"] = location_ids
@@ -90,7 +109,7 @@ class TGLWorld(World):
         # Otherwise, we can just use the default location Dict
         random_location_list: List[str] = []
         if self.options.randomize_map:
-            random_location_list.extend(get_generic_locations_by_id(list(self.tgl_random_locations.keys())))    
+            random_location_list.extend(get_generic_locations_by_id(list(self.tgl_map_snapshot.location_codes)))    
         create_regions(self.multiworld, self.player, random_location_list)
         self._place_events()
 
@@ -124,8 +143,8 @@ class TGLWorld(World):
     def extend_hint_information(self, hint_data: Dict[int, Dict[int, str]]) -> None:
         if self.options.randomize_map:
             hint_data.update({self.player: {}})
-            for loc, data in self.tgl_random_locations.items():
-                hint_data[self.player][loc] = f"X{data[1]} Y{data[2]}"
+            for loc, data in self.tgl_map_snapshot.items():
+                hint_data[self.player][loc] = f"X{data.xcoord} Y{data.ycoord}"
 
     def generate_output(self, output_directory: str) -> None:
         generate_output(self, output_directory, self.options)
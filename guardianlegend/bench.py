@@ -0,0 +1,108 @@
+import argparse
+import json
+import math
+import subprocess
+import sys
+import time
+from collections import Counter
+from random import Random
+from typing import Any, Dict, List, Optional, Sequence
+
+from .Map import TGLMap, TGLMapError, MAP_DATA_MAX_BYTES, MAP_LAYOUT_GROWTH, MAP_LAYOUT_SPANNING_TREE
+
+
+# Benchmarks for the map randomizer, written as JSON so runs can be compared between commits:
+#   python -m worlds.guardianlegend.bench map --seeds 1000 --output map_bench.json
+
+
+def percentiles(values: Sequence[float], points: Sequence[int] = (50, 95, 99)) -> Dict[str, float]:
+    # Nearest-rank percentiles, plus the extremes
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {f"p{point}": ordered[max(0, math.ceil(point / 100 * len(ordered)) - 1)] for point in points}
+    result["min"] = ordered[0]
+    result["max"] = ordered[-1]
+    return result
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_map(seeds: int, first_seed: int = 0, layout: int = MAP_LAYOUT_GROWTH) -> Dict[str, Any]:
+    """Randomizes one map per seed, without retrying failed maps, and collects timing, failure and size figures."""
+    map_times: List[float] = []
+    phase_times: Dict[str, float] = {}
+    failures: Counter = Counter()
+    byte_counts: List[int] = []
+    shortfalls: Counter = Counter()  # Areas that got fewer rooms or connections than they asked for
+    start = time.perf_counter()
+    for seed in range(first_seed, first_seed + seeds):
+        tglmap = TGLMap(instrument=True)
+        map_start = time.perf_counter()
+        try:
+            tglmap.randomize(Random(seed), layout)
+        except TGLMapError as error:
+            failures[type(error).__name__] += 1
+        else:
+            byte_counts.append(tglmap.byte_count)
+        map_times.append(time.perf_counter() - map_start)
+        for phase, seconds in tglmap.stats["phase_seconds"].items():
+            phase_times[phase] = phase_times.get(phase, 0.0) + seconds
+        for area_stats in tglmap.stats["areas"]:
+            if area_stats.get("rooms_grown", 0) < area_stats.get("rooms_requested", 0):
+                shortfalls["rooms"] += 1
+            if area_stats.get("connections_made", 0) < area_stats.get("connections_requested", 0):
+                shortfalls["connections"] += 1
+    total_time = time.perf_counter() - start
+
+    return {
+        "benchmark": "map",
+        "commit": get_commit(),
+        "python": sys.version.split()[0],
+        "layout": layout,
+        "first_seed": first_seed,
+        "seeds": seeds,
+        "total_seconds": total_time,
+        "phase_seconds": phase_times,
+        "map_seconds": percentiles(map_times),
+        "failures": {name: {"count": count, "rate": count / seeds} for name, count in failures.most_common()},
+        "failure_rate": sum(failures.values()) / seeds,
+        "area_shortfalls": {"rooms": shortfalls["rooms"], "connections": shortfalls["connections"]},
+        "map_bytes": {
+            "budget": MAP_DATA_MAX_BYTES,
+            **percentiles(byte_counts),
+            # Maps per 100 Byte bucket, by the bucket's lower bound
+            "histogram": {str(bucket * 100): count for bucket, count in
+                          sorted(Counter(byte_count // 100 for byte_count in byte_counts).items())},
+        },
+    }
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks for The Guardian Legend world.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    map_parser = subparsers.add_parser("map", help="Time map randomization and count its failures")
+    map_parser.add_argument("--seeds", type=int, default=1000, help="Number of seeds to randomize a map for")
+    map_parser.add_argument("--first-seed", type=int, default=0, help="First seed of the range")
+    map_parser.add_argument("--layout", choices=["growth", "spanning_tree"], default="growth",
+                            help="Map layout generator, as in the map_layout option")
+    map_parser.add_argument("--output", help="JSON file to write the results to, instead of printing them")
+    parsed = parser.parse_args(args)
+
+    results = bench_map(parsed.seeds, parsed.first_seed,
+                        MAP_LAYOUT_SPANNING_TREE if parsed.layout == "spanning_tree" else MAP_LAYOUT_GROWTH)
+    if parsed.output:
+        with open(parsed.output, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
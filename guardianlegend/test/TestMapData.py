@@ -0,0 +1,163 @@
+import os
+import tempfile
+from random import Random
+
+from . import TGLTestBase
+
+from worlds.guardianlegend.Map import (TGLMap, TGLRoomType, MAP_LAYOUT_GROWTH, MAP_LAYOUT_SPANNING_TREE,
+                                       MAP_STREAM_SHUFFLE, MAP_STREAM_FINISHING, generate_random_map, 
+                                       generate_random_maps, map_stream)
+from worlds.guardianlegend.MapPool import TGLMapPool, build_map_pool
+
+
+def reference_writehex(tglmap: TGLMap) -> bytes:
+    # Straightforward room-by-room encoder, kept as the reference for the format writehex packs
+    outbytes = bytearray()
+    for row in tglmap.mapdata:
+        for room in row:
+            if not room.is_accessible:
+                outbytes.append(0x80)
+                continue
+            exits_shift = int(room.exits) << 4
+            key_other = TGLMap.areakeys_other[room.area]
+            key_most = TGLMap.areakeys_mostrooms[room.area]
+            if room.room_type == TGLRoomType.NORMAL:
+                roomlength = 2
+                roomkey = key_other
+                roomtype = 0
+                if room.enemy_type != 0:
+                    roomkey = key_most
+                    roomlength += 1
+                if room.block_set >= 0:
+                    roomlength += 2
+                    roomtype = (7 << 4) if room.chip_tile else (1 << 4)
+                outbytes.extend([roomtype + roomlength, exits_shift + roomkey, room.area])
+                if room.enemy_type != 0:
+                    outbytes.append(room.enemy_type)
+                if room.block_set > 0:
+                    outbytes.extend(room.block_set.to_bytes(2, "big"))
+            elif room.room_type == TGLRoomType.SAVE:
+                outbytes.extend([0x82, exits_shift + key_most, 0x01])
+            elif room.room_type == TGLRoomType.CORRIDOR:
+                roomkey = 0 if room.content_id == 1 else key_most
+                outbytes.extend([0x82, exits_shift + roomkey, 0x80 + room.content_id])
+            elif room.room_type == TGLRoomType.TEXT:
+                outbytes.extend([0xA3, exits_shift + key_other, 0x03, room.content_id])
+            elif room.room_type == TGLRoomType.MULTISHOP:
+                outbytes.extend([0xA3, exits_shift + key_other, 0x02, room.content_id])
+            elif room.room_type == TGLRoomType.SINGLESHOP:
+                outbytes.extend([0xA3, exits_shift + key_other, 0x06, room.content_id])
+            elif room.room_type == TGLRoomType.MINIBOSS:
+                outbytes.extend([0x43, exits_shift + key_most, 0x10 + room.area, room.content_id])
+            elif room.room_type == TGLRoomType.ITEM:
+                roomkey = key_other
+                roomlength = 5
+                if room.enemy_type != 0:
+                    roomkey = key_most
+                    roomlength += 1
+                outbytes.extend([0x30 + roomlength, exits_shift + roomkey, room.area, room.content_id])
+                if room.enemy_type != 0:
+                    outbytes.append(room.enemy_type)
+                outbytes.extend(room.block_set.to_bytes(2, "big"))
+    outbytes.append(0x0)
+    return bytes(outbytes)
+
+
+class TestMapEncoding(TGLTestBase):
+    seeds = range(100)
+
+    def test_writehex_matches_reference(self) -> None:
+        for layout in (MAP_LAYOUT_GROWTH, MAP_LAYOUT_SPANNING_TREE):
+            for seed in self.seeds:
+                with self.subTest(layout=layout, seed=seed):
+                    tglmap = generate_random_map(Random(seed), layout)
+                    map_hex = tglmap.writehex()
+                    self.assertEqual(map_hex, reference_writehex(tglmap))
+                    self.assertEqual(len(map_hex), tglmap.byte_count + 1)
+
+
+class TestMapStreams(TGLTestBase):
+    def test_streams_are_independent(self) -> None:
+        draws = [map_stream(12345, stream, index).getrandbits(64) 
+                 for stream in range(MAP_STREAM_SHUFFLE, MAP_STREAM_FINISHING + 1) for index in range(11)]
+        self.assertEqual(len(set(draws)), len(draws))
+        self.assertEqual(map_stream(12345, MAP_STREAM_FINISHING, 1).getrandbits(64), 
+                         map_stream(12345, MAP_STREAM_FINISHING, 1).getrandbits(64))
+
+
+class TestMapStats(TGLTestBase):
+    def test_instrumented_map_is_unchanged(self) -> None:
+        tglmap = generate_random_map(Random(0), instrument=True)
+        self.assertEqual(tglmap.writehex(), generate_random_map(Random(0)).writehex())
+        self.assertEqual(tglmap.stats["map_bytes"], tglmap.byte_count)
+        self.assertIn("area_growth", tglmap.stats["phase_seconds"])
+        self.assertTrue(all("rooms_grown" in area_stats for area_stats in tglmap.stats["areas"]))
+
+    def test_stats_disabled_by_default(self) -> None:
+        self.assertIsNone(generate_random_map(Random(0)).stats)
+
+
+class TestMapDecoding(TGLTestBase):
+    seeds = range(100)
+
+    def test_from_bytes_round_trip(self) -> None:
+        for layout in (MAP_LAYOUT_GROWTH, MAP_LAYOUT_SPANNING_TREE):
+            for seed in self.seeds:
+                with self.subTest(layout=layout, seed=seed):
+                    tglmap = generate_random_map(Random(seed), layout)
+                    map_hex = tglmap.writehex()
+                    decoded = TGLMap.from_bytes(map_hex)
+                    self.assertEqual(decoded.writehex(), map_hex)
+                    self.assertEqual(decoded.get_randomized_item_locations(), tglmap.get_randomized_item_locations())
+                    self.assertEqual(decoded.area_rooms, tglmap.area_rooms)
+                    self.assertCountEqual(decoded.one_way_exits, tglmap.one_way_exits)
+
+    def test_from_bytes_offset(self) -> None:
+        map_hex = generate_random_map(Random(0)).writehex()
+        decoded = TGLMap.from_bytes(b"\xFF" * 16 + map_hex + b"\xFF", 16)
+        self.assertEqual(decoded.writehex(), map_hex)
+
+    def test_from_bytes_truncated(self) -> None:
+        map_hex = generate_random_map(Random(0)).writehex()
+        with self.assertRaises(ValueError):
+            TGLMap.from_bytes(map_hex[:-10])
+
+
+class TestParallelMaps(TGLTestBase):
+    def test_parallel_matches_serial(self) -> None:
+        jobs = [(seed, layout) for seed in range(4) for layout in (MAP_LAYOUT_GROWTH, MAP_LAYOUT_SPANNING_TREE)]
+        for (seed, layout), (snapshot, attempts, _) in zip(jobs, generate_random_maps(jobs, workers=2)):
+            with self.subTest(layout=layout, seed=seed):
+                serial_map = generate_random_map(Random(seed), layout)
+                self.assertEqual(snapshot, serial_map.snapshot())
+                self.assertEqual(attempts, serial_map.attempts)
+
+
+class TestMapSnapshot(TGLTestBase):
+    def test_snapshot_locations(self) -> None:
+        tglmap = generate_random_map(Random(0))
+        snapshot = tglmap.snapshot()
+        self.assertEqual(snapshot.map_data, tglmap.writehex())
+        self.assertEqual(dict(snapshot.items()), tglmap.get_randomized_item_locations())
+        for code, location in tglmap.get_randomized_item_locations().items():
+            self.assertEqual(snapshot.location(code), location)
+        with self.assertRaises(KeyError):
+            snapshot.location(snapshot.location_codes[-1] + 1)
+
+
+class TestMapPool(TGLTestBase):
+    def test_pool_round_trip(self) -> None:
+        with tempfile.TemporaryDirectory() as pool_dir:
+            path = os.path.join(pool_dir, "tgl_map_pool.bin")
+            build_map_pool(path, 5, 1, MAP_LAYOUT_SPANNING_TREE)
+            pool = TGLMapPool(path)
+            try:
+                self.assertEqual(len(pool), 5)
+                self.assertEqual(pool.layout, MAP_LAYOUT_SPANNING_TREE)
+                for index, sub_seed in enumerate(pool.sub_seeds):
+                    tglmap = generate_random_map(Random(sub_seed), MAP_LAYOUT_SPANNING_TREE)
+                    map_data, locations = pool.read(index)
+                    self.assertEqual(map_data, tglmap.writehex())
+                    self.assertEqual(locations, tglmap.get_randomized_item_locations())
+            finally:
+                pool.close()
@@ -0,0 +1,23 @@
+from . import TGLTestBase
+
+from worlds.guardianlegend.Map import TGLMap
+
+
+class TestMapRandoGrowth(TGLTestBase):
+    options = {
+        "randomize_map": True,
+        "map_layout": "growth",
+    }
+
+    def test_map_is_connected(self) -> None:
+        snapshot = self.multiworld.worlds[self.player].tgl_map_snapshot
+        tglmap = TGLMap.from_bytes(snapshot.map_data)
+        self.assertEqual(dict(snapshot.items()), tglmap.get_randomized_item_locations())
+        self.assertEqual(tglmap.find_unreachable_rooms(), [], "Rooms can't be reached from the start")
+
+
+class TestMapRandoSpanningTree(TestMapRandoGrowth):
+    options = {
+        "randomize_map": True,
+        "map_layout": "spanning_tree",
+    }
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import tempfile
+from random import Random
+from types import SimpleNamespace
+from typing import Optional, Tuple
+from unittest import mock
+
+from . import TGLTestBase
+
+from worlds.guardianlegend.Locations import TGL_LOCID_BASE, location_table
+from worlds.guardianlegend.Map import generate_random_map
+
+from worlds.guardianlegend.Rom import (TGLLocationKind, TGLPatchWrites, TGLProcedurePatch, TEXT_END_MESSAGE, 
+                                       base_rom_cache, get_location_patch_table, location_patch_table,
+                                       corridor_hint_texts, corridor_hints_junk, corridor_hints_filler, 
+                                       corridor_hints_useful, corridor_hints_progression, corridor_hints_capacity,
+                                       build_hint_texts, check_hint_length, encode_text_to_bytes, load_base_rom, 
+                                       static_patch_writes)
+
+
+def reference_location_patch(location_code: int) -> Tuple[TGLLocationKind, int, Optional[int]]:
+    # Location type by branches on the location code, kept as the reference for location_patch_table
+    location_data = divmod(location_code - TGL_LOCID_BASE, 1000)
+    if location_data[0] == 1:
+        return TGLLocationKind.GROUND, 0x16388 + location_data[1] - 1, None
+    elif location_data[0] == 2:
+        if location_data[1] > 100:
+            return TGLLocationKind.TRIPLE_SHOP, (0x1605e + (location_data[1] - 100)) + 1, None
+        return TGLLocationKind.SINGLE_SHOP, 0x16077 + location_data[1], None
+    elif location_data[0] == 3:
+        return (TGLLocationKind.CORRIDOR, 0x1ef51 + location_data[1] - 1, 
+                location_data[1] if location_data[1] > 10 else None)
+    elif location_data[0] == 4:
+        return TGLLocationKind.CORRIDOR_BONUS, 0x0, location_data[1] + 100 if location_data[1] > 10 else None
+    raise ValueError(location_code)
+
+
+class TestLocationPatchTable(TGLTestBase):
+    def test_every_location_matches_reference(self) -> None:
+        codes = [data.code for data in location_table.values() if data.code is not None]
+        self.assertCountEqual(location_patch_table.keys(), codes)
+        for code in codes:
+            with self.subTest(code=code):
+                self.assertEqual(tuple(location_patch_table[code]), reference_location_patch(code))
+
+    def test_rom_addresses_are_unique(self) -> None:
+        addresses = [patch.rom_address for patch in location_patch_table.values() if patch.rom_address != 0]
+        self.assertEqual(len(addresses), len(set(addresses)))
+
+    def test_map_rando_overlay(self) -> None:
+        snapshot = generate_random_map(Random(0)).snapshot()
+        world = SimpleNamespace(tgl_map_snapshot=snapshot)
+        location_patches = get_location_patch_table(world, SimpleNamespace(randomize_map=True))
+        self.assertEqual(len(location_patches), len(snapshot.location_codes))
+        for code, location in snapshot.items():
+            self.assertEqual(location_patches[code], location_patch_table[location.location_id])
+        self.assertIs(get_location_patch_table(world, SimpleNamespace(randomize_map=False)), location_patch_table)
+
+
+class TestPatchWrites(TGLTestBase):
+    def test_adjacent_writes_merge(self) -> None:
+        writes = TGLPatchWrites()
+        writes.write(0x87DF, b"\x02")
+        writes.write(0x87DE, b"\x01")
+        writes.write(0x87E0, b"\x03\x04")
+        self.assertEqual(writes.get_runs(), [(0x87DE, b"\x01\x02\x03\x04")])
+
+    def test_later_writes_replace_earlier(self) -> None:
+        writes = TGLPatchWrites()
+        writes.write(0x100, b"\xAA\xAA\xAA")
+        writes.write(0x101, b"\xBB\xBB\xBB")
+        self.assertEqual(writes.get_runs(), [(0x100, b"\xAA\xBB\xBB\xBB")])
+
+    def test_gaps_split_runs(self) -> None:
+        writes = TGLPatchWrites()
+        writes.write(0x200, b"\x01")
+        writes.write(0x100, b"\x02\x03")
+        self.assertEqual(writes.get_runs(), [(0x100, b"\x02\x03"), (0x200, b"\x01")])
+
+    def test_static_writes_are_copied(self) -> None:
+        writes = TGLPatchWrites(static_patch_writes)
+        writes.write(0x1F552, b"\x00")
+        self.assertNotEqual(static_patch_writes.rom_bytes[0x1F552], 0x00)
+
+
+class TestHintTexts(TGLTestBase):
+    def test_hint_texts_match_encoder(self) -> None:
+        hints = {"junk": corridor_hints_junk, "filler": corridor_hints_filler, 
+                 "useful": corridor_hints_useful, "progression": corridor_hints_progression}
+        for level, hints_by_size in hints.items():
+            for size, texts in hints_by_size.items():
+                for text, hint_text in zip(texts, corridor_hint_texts[level][size]):
+                    with self.subTest(text=text):
+                        self.assertEqual(hint_text.for_corridor(17), 
+                                         bytes(encode_text_to_bytes(text, 17)) + bytes([TEXT_END_MESSAGE]))
+
+    def test_over_long_hint_is_rejected(self) -> None:
+        # Corridor 19's hint is directly followed by Corridor 20's
+        hint = ("Corridor-# is", "much too long", "for the space", "it has.")
+        hint_bytes = bytes(encode_text_to_bytes(hint, 19)) + bytes([TEXT_END_MESSAGE])
+        self.assertGreater(len(hint_bytes), corridor_hints_capacity[19])
+        with self.assertRaises(Exception):
+            check_hint_length(hint, hint_bytes, 19)
+        with self.assertRaises(Exception):
+            build_hint_texts({"short": [hint]})
+
+    def test_unknown_characters(self) -> None:
+        self.assertEqual(encode_text_to_bytes(("a~\u00e9 #",), 12), bytearray(b"a??\x0b12"))
+
+
+class TestBaseRom(TGLTestBase):
+    rom_data = bytes(range(256)) * 4
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.rom_dir = tempfile.TemporaryDirectory()
+        self.rom_path = os.path.join(self.rom_dir.name, "tgl.nes")
+        with open(self.rom_path, "wb") as outfile:
+            outfile.write(self.rom_data)
+
+    def tearDown(self) -> None:
+        base_rom_cache.pop(os.path.abspath(self.rom_path), None)
+        self.rom_dir.cleanup()
+        super().tearDown()
+
+    def test_wrong_rom_is_rejected(self) -> None:
+        with self.assertRaises(Exception):
+            load_base_rom(self.rom_path)
+
+    def test_rom_is_read_once(self) -> None:
+        with mock.patch.object(TGLProcedurePatch, "hash", hashlib.md5(self.rom_data).hexdigest()):
+            first = load_base_rom(self.rom_path)
+            self.assertEqual(first, self.rom_data)
+            self.assertIs(load_base_rom(self.rom_path), first)